@@ -3,6 +3,9 @@ from django.utils.html import format_html
 
 from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
                             RecipeIngredient, ShoppingCart, Tag)
+from recipes.shopping_list_items import (amount_changes,
+                                         change_shopping_lists_for_recipe,
+                                         recipe_amounts)
 
 
 @admin.register(Tag)
@@ -38,9 +41,29 @@ class RecipeAdmin(admin.ModelAdmin):
     inlines = [RecipeIngredientInline]
     filter_horizontal = ('tags',)
 
-    @admin.display(description='Добавлений в избранное')
+    def save_related(self, request, form, formsets, change):
+        recipe_id = form.instance.pk
+        ingredients_changed = any(
+            formset.has_changed() for formset in formsets
+        )
+        if ingredients_changed:
+            old_amounts = recipe_amounts([recipe_id])
+        super().save_related(request, form, formsets, change)
+        if ingredients_changed:
+            change_shopping_lists_for_recipe(
+                recipe_id,
+                amount_changes(old_amounts, recipe_amounts([recipe_id]))
+            )
+        # Теги и ингредиенты сохраняются после самого рецепта.
+        if ingredients_changed or 'tags' in form.changed_data:
+            Recipe.objects.filter(pk=recipe_id).touch()
+
+    @admin.display(
+        description='Добавлений в избранное',
+        ordering='favorites_count'
+    )
     def favorites_count(self, obj):
-        return obj.favorited_by.count()
+        return obj.favorites_count
 
     @admin.display(description='Ингредиенты')
     def display_ingredients(self, obj):
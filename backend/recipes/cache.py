@@ -0,0 +1,92 @@
+"""
+Версии наборов данных и ключи кеша представлений.
+
+Версии и представления рассчитаны на общий для всех процессов кеш
+(Redis, Memcached). С кешем в памяти процесса (LocMemCache по умолчанию)
+изменения, сделанные другими воркерами и управляющими командами, сюда не
+доходят, поэтому время жизни записей ограничивается LOCAL_CACHE_TIMEOUT:
+устаревшие версии, а вместе с ними снимки справочников и индекс
+ингредиентов, живут не дольше этого срока.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from recipes.constants import LOCAL_CACHE_TIMEOUT
+
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Увеличивается при изменении формы закешированного представления рецепта.
+RECIPE_REPRESENTATION_VERSION = 1
+
+
+def is_process_local_cache():
+    return settings.CACHES['default']['BACKEND'] in LOCAL_CACHE_BACKENDS
+
+
+def cache_timeout(timeout):
+    """Время жизни записи с учётом того, общий ли кеш у процессов."""
+    if not is_process_local_cache():
+        return timeout
+    if timeout is None:
+        return LOCAL_CACHE_TIMEOUT
+    return min(timeout, LOCAL_CACHE_TIMEOUT)
+
+
+def model_version_key(model):
+    return f'version:{model._meta.label_lower}'
+
+
+def user_version_key(user_id):
+    return f'version:user:{user_id}'
+
+
+def get_version(key):
+    """
+    Возвращает текущую версию набора данных.
+    Начальное значение берётся из времени, чтобы версия, потерянная при
+    вытеснении из кеша, не совпала с уже выданной ранее.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), cache_timeout(None))
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), cache_timeout(None))
+
+
+def bump_version_on_commit(key):
+    """
+    Увеличивает версию сейчас и ещё раз после фиксации транзакции:
+    ответ, собранный до фиксации, содержит старые данные под новой версией.
+    """
+    bump_version(key)
+    transaction.on_commit(lambda: bump_version(key))
+
+
+def recipe_representation_key(recipe_id):
+    return f'recipe:{RECIPE_REPRESENTATION_VERSION}:{recipe_id}'
+
+
+def invalidate_recipe_representations(recipe_ids):
+    """
+    Сбрасывает закешированные представления рецептов.
+    Внутри транзакции сброс повторяется после коммита, чтобы в кеш не
+    попали данные, прочитанные до фиксации изменений.
+    """
+    keys = [recipe_representation_key(recipe_id) for recipe_id in recipe_ids]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,44 @@
+"""
+Заранее отрендеренные ответы справочников тегов и ингредиентов.
+
+Справочники меняются только через админку, поэтому полный список
+рендерится один раз на версию справочника и хранится в памяти процесса
+в виде готовых байтов: как есть и сжатым gzip. ETag строгий и вычисляется
+по содержимому ответа, поэтому у сжатого и несжатого вариантов он разный.
+"""
+import gzip
+import hashlib
+import threading
+
+from django.utils.http import quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from recipes.cache import get_version, model_version_key
+
+_lock = threading.Lock()
+_snapshots = {}
+
+
+class CatalogSnapshot:
+    def __init__(self, data, version):
+        self.version = version
+        self.content = JSONRenderer().render(data)
+        self.gzipped = gzip.compress(self.content)
+        self.etag = quote_etag(hashlib.md5(self.content).hexdigest())
+        self.gzip_etag = quote_etag(hashlib.md5(self.gzipped).hexdigest())
+
+
+def get_catalog_snapshot(queryset, serializer_class):
+    """Возвращает снимок полного списка, перестраивая его при смене версии."""
+    model = queryset.model
+    version = get_version(model_version_key(model))
+    snapshot = _snapshots.get(model)
+    if snapshot is None or snapshot.version != version:
+        with _lock:
+            snapshot = _snapshots.get(model)
+            if snapshot is None or snapshot.version != version:
+                snapshot = CatalogSnapshot(
+                    serializer_class(queryset, many=True).data, version
+                )
+                _snapshots[model] = snapshot
+    return snapshot
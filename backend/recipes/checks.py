@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+from recipes.cache import is_process_local_cache
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if settings.DEBUG or not is_process_local_cache():
+        return []
+    return [Warning(
+        'Кеш по умолчанию не общий для процессов: версии данных, '
+        'представления рецептов и снимки справочников обновляются в '
+        'других воркерах с задержкой до LOCAL_CACHE_TIMEOUT секунд.',
+        hint=(
+            'Укажите общий кеш (Memcached, Redis) в переменных '
+            'окружения CACHE_BACKEND и CACHE_LOCATION.'
+        ),
+        id='recipes.W001',
+    )]
@@ -5,3 +5,35 @@ MAX_LENGTH_RECIPE_NAME = 256
 MAX_LENGTH_SHORT_LINK = 20
 MIN_COOKING_TIME = 1
 MIN_INGREDIENT_AMOUNT = 1
+COUNT_CACHE_TIMEOUT = 30
+ESTIMATED_COUNT_THRESHOLD = 10000
+RECIPE_CACHE_TIMEOUT = 60 * 60 * 24
+# Предельное время жизни записей, если кеш не общий для процессов.
+LOCAL_CACHE_TIMEOUT = 60
+COUNTERS_FLUSH_SIZE = 100
+COUNTERS_FLUSH_INTERVAL = 5
+MAX_LENGTH_SEARCH_TERM = 64
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60 * 24
+SHOPPING_LIST_WAIT_TIMEOUT = 2
+SHOPPING_LIST_RETRY_AFTER = 1
+SHOPPING_LIST_CHUNK_SIZE = 500
+MAX_BULK_RECIPES = 100
+MAX_BULK_AUTHORS = 100
+SHORT_LINK_ALPHABET = (
+    '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+)
+# Старые случайные ссылки состоят из 4 символов; ссылки из id длиннее.
+SHORT_LINK_MIN_LENGTH = 5
+# Наибольший id рецепта: предел BigAutoField.
+MAX_RECIPE_ID = 2 ** 63 - 1
+SHORT_LINK_LRU_SIZE = 10000
+# Сколько запись живёт в LRU процесса: удаление рецепта в другом воркере
+# чистит только общий кеш, и устаревшая запись здесь истекает сама.
+SHORT_LINK_LRU_TIMEOUT = 60
+SHORT_LINK_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+# Редирект временный и кешируется ненадолго: после удаления рецепта
+# браузеры и CDN быстро перестанут на него вести.
+SHORT_LINK_REDIRECT_MAX_AGE = 60
+MAX_IMAGE_UPLOAD_SIZE = 10 * 1024 * 1024
+# Длина куска base64-строки, декодируемого за раз; кратна четырём.
+IMAGE_DECODE_CHUNK_SIZE = 64 * 1024
@@ -0,0 +1,103 @@
+"""
+Буферизация изменений счётчиков избранного и корзины у рецептов.
+
+Клики по популярному рецепту не обновляют его строку по отдельности:
+изменения копятся в памяти процесса и сбрасываются одним UPDATE на пачку,
+когда накопилось COUNTERS_FLUSH_SIZE рецептов, а иначе фоновым таймером
+через COUNTERS_FLUSH_INTERVAL секунд после первого отложенного изменения.
+При штатном завершении процесса (в том числе при перезапуске воркера
+gunicorn) остаток сбрасывается через atexit. Изменения, потерянные при
+аварийном завершении, исправляет команда reconcile_recipe_counters.
+"""
+import atexit
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+
+from recipes.cache import bump_version, model_version_key
+from recipes.constants import COUNTERS_FLUSH_INTERVAL, COUNTERS_FLUSH_SIZE
+from recipes.models import Recipe
+
+_lock = threading.Lock()
+_pending = defaultdict(Counter)
+_last_flush = time.monotonic()
+_timer = None
+
+
+def buffer_counter(recipe_id, field, delta):
+    """Откладывает изменение счётчика field рецепта на delta."""
+    with _lock:
+        _pending[field][recipe_id] += delta
+        size = sum(len(deltas) for deltas in _pending.values())
+        due = (
+            size >= COUNTERS_FLUSH_SIZE
+            or time.monotonic() - _last_flush >= COUNTERS_FLUSH_INTERVAL
+        )
+        if not due:
+            schedule_flush()
+    if due:
+        flush_counters()
+
+
+def schedule_flush():
+    """Запускает таймер сброса, если он ещё не запущен. Вызывать под _lock."""
+    global _timer
+    if _timer is None:
+        _timer = threading.Timer(COUNTERS_FLUSH_INTERVAL, flush_by_timer)
+        _timer.daemon = True
+        _timer.start()
+
+
+def flush_by_timer():
+    global _timer
+    with _lock:
+        _timer = None
+    try:
+        flush_counters()
+    finally:
+        # У потока таймера своё соединение с базой.
+        connection.close()
+
+
+def flush_counters():
+    """Записывает накопленные изменения: один UPDATE на каждый счётчик."""
+    global _last_flush, _timer
+    with _lock:
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+        pending = {
+            field: {
+                recipe_id: delta
+                for recipe_id, delta in deltas.items() if delta
+            }
+            for field, deltas in _pending.items()
+        }
+        _pending.clear()
+        _last_flush = time.monotonic()
+    for field, deltas in pending.items():
+        if not deltas:
+            continue
+        Recipe.objects.filter(pk__in=deltas).update(**{
+            field: Greatest(
+                F(field) + Case(
+                    *[
+                        When(pk=recipe_id, then=Value(delta))
+                        for recipe_id, delta in deltas.items()
+                    ],
+                    default=Value(0),
+                    output_field=IntegerField()
+                ),
+                Value(0)
+            )
+        })
+    if any(pending.values()):
+        # Счётчики влияют на сортировку списка рецептов и его ETag.
+        bump_version(model_version_key(Recipe))
+
+
+atexit.register(flush_counters)
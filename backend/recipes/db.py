@@ -0,0 +1,125 @@
+"""Запросы, которые ORM Django 3.2 не умеет строить сам."""
+from django.db import connections, models, router
+from django.db.models.signals import post_save
+
+
+class DerivedFieldsMixin(models.Model):
+    """
+    Полное сохранение существующего объекта не записывает поля
+    DERIVED_FIELDS: они меняются только отдельными UPDATE, и значения
+    в памяти могут быть устаревшими.
+    """
+
+    DERIVED_FIELDS = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not kwargs.get('force_insert')
+            and kwargs.get('update_fields') is None
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.DERIVED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+
+def insert_ignore(objs, returning=None):
+    """
+    Вставляет объекты одним INSERT ... ON CONFLICT DO NOTHING
+    (INSERT OR IGNORE на SQLite) и возвращает число вставленных строк.
+    С returning возвращает значения этого поля у вставленных строк, если
+    база поддерживает RETURNING, иначе None.
+    """
+    objs = list(objs)
+    model = type(objs[0])
+    opts = model._meta
+    using = router.db_for_write(model)
+    connection = connections[using]
+    quote_name = connection.ops.quote_name
+    fields = [field for field in opts.concrete_fields if not field.primary_key]
+    params = [
+        field.get_db_prep_save(field.pre_save(obj, add=True), connection)
+        for obj in objs
+        for field in fields
+    ]
+    placeholders = '({})'.format(', '.join(['%s'] * len(fields)))
+    sql = '{} {} ({}) VALUES {} {}'.format(
+        connection.ops.insert_statement(ignore_conflicts=True),
+        quote_name(opts.db_table),
+        ', '.join(quote_name(field.column) for field in fields),
+        ', '.join([placeholders] * len(objs)),
+        connection.ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)
+    )
+    can_return = (
+        returning is not None
+        and connection.features.can_return_rows_from_bulk_insert
+    )
+    if can_return:
+        sql += f' RETURNING {quote_name(opts.get_field(returning).column)}'
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        if can_return:
+            return [row[0] for row in cursor.fetchall()]
+        if returning is not None:
+            return None
+        return cursor.rowcount
+
+
+def create_ignoring_conflict(obj):
+    """
+    Сохраняет новый объект, если он не нарушает ограничений уникальности.
+    Возвращает True, если строка вставлена; в этом случае, как и при
+    обычном сохранении, отправляется post_save.
+    """
+    if not insert_ignore([obj]):
+        return False
+    post_save.send(
+        sender=type(obj),
+        instance=obj,
+        created=True,
+        update_fields=None,
+        raw=False,
+        using=router.db_for_write(type(obj))
+    )
+    return True
+
+
+def delete_relations(model, user_id, field, values):
+    """
+    Удаляет строки model пользователя user_id, у которых поле field
+    принимает одно из значений values, одним DELETE и возвращает
+    множество значений field у удалённых строк. Сигналы не отправляются:
+    их действия вызывающий код выполняет сам сразу для всей пачки.
+    """
+    values = list(values)
+    if not values:
+        return set()
+    opts = model._meta
+    connection = connections[router.db_for_write(model)]
+    quote_name = connection.ops.quote_name
+    table = quote_name(opts.db_table)
+    column = quote_name(opts.get_field(field).column)
+    where = '{} = %s AND {} IN ({})'.format(
+        quote_name(opts.get_field('user').column),
+        column,
+        ', '.join(['%s'] * len(values))
+    )
+    params = [user_id, *values]
+    with connection.cursor() as cursor:
+        # DELETE ... RETURNING есть там же, где и INSERT ... RETURNING.
+        if connection.features.can_return_rows_from_bulk_insert:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE {where} RETURNING {column}',
+                params
+            )
+            return {row[0] for row in cursor.fetchall()}
+        cursor.execute(f'SELECT {column} FROM {table} WHERE {where}', params)
+        removed = {row[0] for row in cursor.fetchall()}
+        cursor.execute(f'DELETE FROM {table} WHERE {where}', params)
+    return removed
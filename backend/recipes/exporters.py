@@ -0,0 +1,66 @@
+"""
+Рендеринг списка покупок в файлы.
+
+Функции модуля не обращаются к Django и принимают только простые данные,
+поэтому выполняются в отдельных процессах пула.
+"""
+import csv
+import io
+import os
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+PDF_FONT_NAME = 'ShoppingListFont'
+PDF_FALLBACK_FONT = 'Helvetica'
+PDF_MARGIN = 20 * mm
+PDF_TITLE_SIZE = 16
+PDF_FONT_SIZE = 12
+PDF_LINE_HEIGHT = 7 * mm
+
+
+def render_csv(items):
+    """items — последовательность (название, единица измерения, количество)."""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(('Ингредиент', 'Единица измерения', 'Количество'))
+    writer.writerows(items)
+    # BOM нужен, чтобы Excel распознал кодировку.
+    return output.getvalue().encode('utf-8-sig')
+
+
+def register_font(font_path):
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+    if not font_path or not os.path.exists(font_path):
+        return PDF_FALLBACK_FONT
+    pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, font_path))
+    return PDF_FONT_NAME
+
+
+def render_pdf(items, font_path):
+    font = register_font(font_path)
+    output = io.BytesIO()
+    pdf = canvas.Canvas(output, pagesize=A4)
+    _, height = A4
+    y = height - PDF_MARGIN
+    pdf.setFont(font, PDF_TITLE_SIZE)
+    pdf.drawString(PDF_MARGIN, y, 'Список покупок')
+    y -= 2 * PDF_LINE_HEIGHT
+    pdf.setFont(font, PDF_FONT_SIZE)
+    if not items:
+        pdf.drawString(PDF_MARGIN, y, 'Список покупок пуст.')
+    for name, measurement_unit, amount in items:
+        if y < PDF_MARGIN:
+            pdf.showPage()
+            pdf.setFont(font, PDF_FONT_SIZE)
+            y = height - PDF_MARGIN
+        pdf.drawString(
+            PDF_MARGIN, y, f'{name} ({measurement_unit}) — {amount}'
+        )
+        y -= PDF_LINE_HEIGHT
+    pdf.save()
+    return output.getvalue()
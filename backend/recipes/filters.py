@@ -1,7 +1,9 @@
 from django_filters.rest_framework import (BaseInFilter, BooleanFilter,
                                            CharFilter, FilterSet, NumberFilter)
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
 
 from recipes.models import Ingredient, Recipe
+from recipes.search import search_recipes
 
 
 class IngredientFilter(FilterSet):
@@ -24,12 +26,26 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
-    tags = CharInFilter(field_name='tags__slug', lookup_expr='in')
+    tags = CharInFilter(
+        field_name='tags__slug',
+        lookup_expr='in',
+        distinct=True
+    )
     author = NumberFilter(field_name='author__id')
+    min_favorites = NumberFilter(
+        field_name='favorites_count',
+        lookup_expr='gte'
+    )
 
     class Meta:
         model = Recipe
-        fields = ['is_favorited', 'is_in_shopping_cart', 'tags', 'author']
+        fields = [
+            'is_favorited',
+            'is_in_shopping_cart',
+            'tags',
+            'author',
+            'min_favorites'
+        ]
 
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
@@ -46,3 +62,21 @@ class RecipeFilter(FilterSet):
         if value:
             return queryset.filter(in_shopping_cart__user=user)
         return queryset.exclude(in_shopping_cart__user=user)
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """
+    Полнотекстовый поиск по ?search=. Без явного ?ordering результаты
+    упорядочиваются по релевантности.
+    """
+
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        queryset = search_recipes(queryset, query)
+        if request.query_params.get(OrderingFilter.ordering_param):
+            return queryset
+        return queryset.order_by('-search_rank', '-pub_date', '-id')
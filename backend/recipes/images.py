@@ -0,0 +1,129 @@
+"""
+Приём загружаемых изображений.
+
+Строка data:image/...;base64,... декодируется по кускам сразу в файл
+загрузки: небольшие изображения остаются в памяти, крупные пишутся во
+временный файл, который хранилище потом просто перемещает. Размер
+проверяется по длине строки ещё до декодирования, формат — по сигнатуре
+первых байтов, поэтому неподходящие данные отклоняются без лишней работы.
+"""
+import base64
+import binascii
+import io
+import re
+
+from django.conf import settings
+from django.core.files.uploadedfile import (InMemoryUploadedFile,
+                                            TemporaryUploadedFile)
+
+from recipes.constants import IMAGE_DECODE_CHUNK_SIZE, MAX_IMAGE_UPLOAD_SIZE
+
+DATA_URL_RE = re.compile(r'data:image/[\w.+-]+;base64,')
+WHITESPACE_RE = re.compile(r'\s+')
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png', 'image/png'),
+    (b'\xff\xd8\xff', 'jpg', 'image/jpeg'),
+    (b'GIF87a', 'gif', 'image/gif'),
+    (b'GIF89a', 'gif', 'image/gif'),
+)
+SIGNATURE_LENGTH = 12
+
+
+class ImageUploadError(ValueError):
+    pass
+
+
+def detect_image_format(header):
+    """Возвращает (расширение, content type) по первым байтам файла."""
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp', 'image/webp'
+    for signature, extension, content_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return extension, content_type
+    raise ImageUploadError(
+        'Поддерживаются изображения PNG, JPEG, GIF и WEBP.'
+    )
+
+
+def check_image_size(size):
+    if size > MAX_IMAGE_UPLOAD_SIZE:
+        raise ImageUploadError(
+            'Размер изображения не должен превышать '
+            f'{MAX_IMAGE_UPLOAD_SIZE // (1024 * 1024)} МБ.'
+        )
+
+
+def check_uploaded_image(uploaded_file):
+    """
+    Проверяет размер и формат файла, загруженного без base64, и задаёт
+    ему имя с расширением, соответствующим содержимому.
+    """
+    check_image_size(uploaded_file.size)
+    uploaded_file.seek(0)
+    extension, _ = detect_image_format(
+        uploaded_file.read(SIGNATURE_LENGTH)
+    )
+    uploaded_file.seek(0)
+    uploaded_file.name = f'uploaded.{extension}'
+    return uploaded_file
+
+
+def is_base64_image(data):
+    return isinstance(data, str) and DATA_URL_RE.match(data) is not None
+
+
+def iter_base64_chunks(data, start):
+    """Декодирует base64 начиная с позиции start, выдавая байты кусками."""
+    rest = ''
+    for offset in range(start, len(data), IMAGE_DECODE_CHUNK_SIZE):
+        chunk = rest + WHITESPACE_RE.sub(
+            '', data[offset:offset + IMAGE_DECODE_CHUNK_SIZE]
+        )
+        complete = len(chunk) - len(chunk) % 4
+        chunk, rest = chunk[:complete], chunk[complete:]
+        if chunk:
+            yield base64.b64decode(chunk, validate=True)
+    if rest:
+        raise binascii.Error('Incorrect padding')
+
+
+def create_upload_file(name, content_type, size):
+    if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+        return TemporaryUploadedFile(name, content_type, 0, None)
+    return InMemoryUploadedFile(
+        io.BytesIO(), None, name, content_type, 0, None
+    )
+
+
+def decode_base64_image(data):
+    """Превращает data URL с изображением в файл загрузки Django."""
+    start = DATA_URL_RE.match(data).end()
+    # Оценка сверху: каждые четыре символа base64 дают три байта.
+    estimated_size = (len(data) - start) // 4 * 3
+    check_image_size(estimated_size)
+    chunks = iter_base64_chunks(data, start)
+    # Первый кусок может оказаться короче сигнатуры, если в начале строки
+    # много пробельных символов.
+    header = b''
+    try:
+        while len(header) < SIGNATURE_LENGTH:
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            header += chunk
+    except binascii.Error:
+        raise ImageUploadError('Некорректные данные base64.')
+    extension, content_type = detect_image_format(header)
+    uploaded_file = create_upload_file(
+        f'uploaded.{extension}', content_type, estimated_size
+    )
+    try:
+        uploaded_file.write(header)
+        for chunk in chunks:
+            uploaded_file.write(chunk)
+    except binascii.Error:
+        uploaded_file.close()
+        raise ImageUploadError('Некорректные данные base64.')
+    uploaded_file.size = uploaded_file.tell()
+    uploaded_file.seek(0)
+    return uploaded_file
@@ -0,0 +1,92 @@
+"""
+Индекс ингредиентов в памяти процесса для автодополнения.
+
+Справочник небольшой (около 2 200 строк) и меняется только через админку,
+поэтому поиск по имени выполняется без обращения к базе: префиксные
+совпадения находятся бинарным поиском по отсортированным нормализованным
+именам и идут раньше совпадений по подстроке. Индекс перестраивается,
+когда меняется версия справочника ингредиентов. Число рецептов с каждым
+ингредиентом для rank=usage перечитывается отдельно, когда меняется
+версия состава рецептов.
+"""
+import threading
+from bisect import bisect_left
+
+from django.db.models import Count
+
+from recipes.cache import get_version, model_version_key
+from recipes.models import Ingredient, RecipeIngredient
+
+_lock = threading.Lock()
+_index = None
+
+
+def normalize(value):
+    return value.casefold().replace('ё', 'е').strip()
+
+
+class IngredientIndex:
+    def __init__(self, ingredients, version):
+        self.version = version
+        self.entries = sorted(
+            (normalize(ingredient.name), ingredient.name, ingredient.id)
+            for ingredient in ingredients
+        )
+        self.keys = [key for key, _, _ in self.entries]
+        self.ingredients = {
+            ingredient.id: ingredient for ingredient in ingredients
+        }
+        self.usage = {}
+        self.usage_version = None
+
+    @classmethod
+    def build(cls, version):
+        return cls(list(Ingredient.objects.all()), version)
+
+    def refresh_usage(self, usage_version):
+        self.usage = dict(RecipeIngredient.objects.order_by().values(
+            'ingredient'
+        ).annotate(total=Count('recipe', distinct=True)).values_list(
+            'ingredient', 'total'
+        ))
+        self.usage_version = usage_version
+
+    def search(self, query, by_usage=False):
+        """
+        Возвращает ингредиенты, чьё имя начинается с query, а за ними —
+        содержащие query. by_usage упорядочивает каждую группу по числу
+        рецептов с ингредиентом.
+        """
+        query = normalize(query)
+        start = bisect_left(self.keys, query)
+        end = start
+        while end < len(self.keys) and self.keys[end].startswith(query):
+            end += 1
+        prefix = [entry[2] for entry in self.entries[start:end]]
+        substring = [
+            entry[2] for entry in self.entries[:start] + self.entries[end:]
+            if query in entry[0]
+        ]
+        if by_usage:
+            usage = self.usage
+            prefix.sort(key=lambda pk: -usage.get(pk, 0))
+            substring.sort(key=lambda pk: -usage.get(pk, 0))
+        return [self.ingredients[pk] for pk in prefix + substring]
+
+
+def get_ingredient_index(with_usage=False):
+    global _index
+    version = get_version(model_version_key(Ingredient))
+    index = _index
+    if index is None or index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                _index = IngredientIndex.build(version)
+            index = _index
+    if with_usage:
+        usage_version = get_version(model_version_key(RecipeIngredient))
+        if index.usage_version != usage_version:
+            with _lock:
+                if index.usage_version != usage_version:
+                    index.refresh_usage(usage_version)
+    return index
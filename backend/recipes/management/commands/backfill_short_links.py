@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.short_links import encode_short_link
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Записывает вычисленную из id короткую ссылку рецептам, '
+        'у которых short_link не заполнен.'
+    )
+
+    def handle(self, *args, **options):
+        updated = 0
+        while True:
+            recipes = list(Recipe.objects.filter(
+                short_link__isnull=True
+            ).only('pk').order_by('pk')[:BATCH_SIZE])
+            if not recipes:
+                break
+            for recipe in recipes:
+                recipe.short_link = encode_short_link(recipe.pk)
+            Recipe.objects.bulk_update(recipes, ['short_link'])
+            updated += len(recipes)
+        self.stdout.write(self.style.SUCCESS(
+            f'Короткие ссылки записаны для {updated} рецептов.'
+        ))
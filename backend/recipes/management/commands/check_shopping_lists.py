@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import ShoppingListItem
+from recipes.shopping_list_items import (live_shopping_lists,
+                                         rebuild_shopping_lists)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет материализованные списки покупок с корзинами '
+        'и при --fix пересчитывает расходящиеся.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Пересчитать списки покупок с расхождениями.'
+        )
+
+    def handle(self, *args, **options):
+        expected = live_shopping_lists()
+        stored = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount
+            in ShoppingListItem.objects.values_list(
+                'user_id', 'ingredient_id', 'amount'
+            ).iterator()
+        }
+        broken_users = sorted({
+            key[0] for key in expected.keys() | stored.keys()
+            if expected.get(key) != stored.get(key)
+        })
+        if not broken_users:
+            self.stdout.write(self.style.SUCCESS(
+                'Списки покупок совпадают с корзинами.'
+            ))
+            return
+        self.stdout.write(self.style.WARNING(
+            f'Расхождения у {len(broken_users)} пользователей: '
+            f'{", ".join(map(str, broken_users))}.'
+        ))
+        if options['fix']:
+            rebuild_shopping_lists(broken_users)
+            self.stdout.write(self.style.SUCCESS('Списки пересчитаны.'))
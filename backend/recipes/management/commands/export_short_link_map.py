@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.constants import SHORT_LINK_REDIRECT_MAX_AGE
+from recipes.models import Recipe
+from recipes.redirects import recipe_url
+from recipes.short_links import encode_short_link
+
+MAP_VARIABLE = '$short_link_target'
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает короткие ссылки в файл map для nginx. Файл подключается '
+        'на уровне http, а в location /s/ перед proxy_pass достаточно '
+        f'"if ({MAP_VARIABLE}) {{ add_header Cache-Control '
+        f'\'public, max-age={SHORT_LINK_REDIRECT_MAX_AGE}\' always; '
+        f'return 302 {MAP_VARIABLE}; }}": тогда известные ссылки '
+        'обслуживает nginx с тем же временным редиректом, что и '
+        'приложение. Ссылки удалённых рецептов остаются в файле до '
+        'следующей выгрузки, поэтому команду стоит запускать '
+        'периодически, например из cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            nargs='?',
+            help='Путь к файлу; по умолчанию вывод в stdout.'
+        )
+
+    def handle(self, *args, **options):
+        output = (
+            open(options['output'], 'w', encoding='utf-8')
+            if options['output'] else self.stdout
+        )
+        count = 0
+        try:
+            output.write(f'map $uri {MAP_VARIABLE} {{\n    default "";\n')
+            recipes = Recipe.objects.order_by('pk').values_list(
+                'pk', 'short_link'
+            ).iterator()
+            for recipe_id, short_link in recipes:
+                url = recipe_url(recipe_id, settings.FRONTEND_URL)
+                codes = {encode_short_link(recipe_id), short_link} - {None}
+                for code in sorted(codes):
+                    # get-link отдаёт ссылку без завершающего слеша.
+                    output.write(
+                        f'    /s/{code} {url};\n    /s/{code}/ {url};\n'
+                    )
+                    count += 1
+            output.write('}\n')
+        finally:
+            if options['output']:
+                output.close()
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Выгружено {count} ссылок в {options["output"]}.'
+            ))
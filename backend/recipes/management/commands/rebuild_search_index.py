@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.search import update_search_index
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает поисковый индекс всех рецептов.'
+
+    def handle(self, *args, **options):
+        recipe_ids = list(Recipe.objects.values_list('pk', flat=True))
+        for start in range(0, len(recipe_ids), BATCH_SIZE):
+            update_search_index(recipe_ids[start:start + BATCH_SIZE])
+        self.stdout.write(self.style.SUCCESS(
+            f'Поисковый индекс пересчитан для {len(recipe_ids)} рецептов.'
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.counters import flush_counters
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+
+
+def count_by_recipe(queryset):
+    return Coalesce(Subquery(
+        queryset.filter(recipe=OuterRef('pk')).order_by().values(
+            'recipe'
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сбрасывает накопленные изменения и пересчитывает счётчики '
+        'избранного и корзины у рецептов.'
+    )
+
+    def handle(self, *args, **options):
+        flush_counters()
+        updated = Recipe.objects.update(
+            favorites_count=count_by_recipe(FavoriteRecipe.objects.all()),
+            in_carts_count=count_by_recipe(ShoppingCart.objects.all())
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики пересчитаны для {updated} рецептов.'
+        ))
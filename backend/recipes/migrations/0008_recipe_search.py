@@ -0,0 +1,90 @@
+# Generated by Django 3.2.3 on 2026-10-17 12:00
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS recipes_recipe_search_vector_gin '
+        'ON recipes_recipe USING GIN (search_vector)'
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS recipes_recipe_name_trgm '
+        'ON recipes_recipe USING GIN (name gin_trgm_ops)'
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'DROP INDEX IF EXISTS recipes_recipe_search_vector_gin'
+    )
+    schema_editor.execute('DROP INDEX IF EXISTS recipes_recipe_name_trgm')
+
+
+def fill_search_index(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeSearchTerm = apps.get_model('recipes', 'RecipeSearchTerm')
+    if schema_editor.connection.vendor == 'postgresql':
+        Recipe.objects.update(search_vector=(
+            SearchVector('name', weight='A', config='russian')
+            + SearchVector('text', weight='B', config='russian')
+        ))
+        return
+    from recipes.search import NAME_WEIGHT, TEXT_WEIGHT, tokenize
+    terms = []
+    for recipe_id, name, text in Recipe.objects.values_list(
+        'id', 'name', 'text'
+    ).iterator():
+        weights = dict.fromkeys(tokenize(text), TEXT_WEIGHT)
+        for term in tokenize(name):
+            weights[term] = weights.get(term, 0) + NAME_WEIGHT
+        terms.extend(
+            RecipeSearchTerm(recipe_id=recipe_id, term=term, weight=weight)
+            for term, weight in weights.items()
+        )
+    RecipeSearchTerm.objects.bulk_create(terms, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.CreateModel(
+            name='RecipeSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Основа слова')),
+                ('weight', models.PositiveSmallIntegerField(verbose_name='Вес')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Поисковый термин',
+                'verbose_name_plural': 'Поисковые термины',
+                'unique_together': {('term', 'recipe')},
+            },
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+        migrations.RunPython(fill_search_index, migrations.RunPython.noop),
+    ]
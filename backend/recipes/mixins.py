@@ -0,0 +1,108 @@
+import hashlib
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from recipes.cache import (get_version, model_version_key,
+                           user_version_key)
+from recipes.catalog import get_catalog_snapshot
+
+
+class ConditionalGetMixin:
+    """
+    Отдаёт ETag и Last-Modified для list и retrieve и отвечает
+    304 Not Modified на условные запросы, не выполняя сериализацию.
+    Наследники переопределяют get_list_validators / get_detail_validators.
+    """
+
+    def get_list_validators(self, request):
+        """Возвращает пару (ключ для ETag, datetime изменения) или None."""
+        return None, None
+
+    def get_detail_validators(self, request):
+        return None, None
+
+    def get_user_validator(self, request):
+        """Версия избранного, корзины и подписок текущего пользователя."""
+        user = request.user
+        if not user.is_authenticated:
+            return 'anonymous'
+        return f'{user.pk}:{get_version(user_version_key(user.pk))}'
+
+    def conditional_response(self, request, validators, handler,
+                             *args, **kwargs):
+        etag_key, last_modified = validators
+        etag = None
+        if etag_key is not None:
+            etag = quote_etag(
+                hashlib.md5(str(etag_key).encode()).hexdigest()
+            )
+        timestamp = (
+            int(last_modified.timestamp()) if last_modified else None
+        )
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            if etag:
+                response['ETag'] = etag
+            if timestamp:
+                response['Last-Modified'] = http_date(timestamp)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, self.get_list_validators(request),
+            super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, self.get_detail_validators(request),
+            super().retrieve, *args, **kwargs
+        )
+
+
+class CatalogConditionalGetMixin(ConditionalGetMixin):
+    """
+    Валидаторы для справочников, меняющихся только через админку.
+    Полный список без параметров отдаётся из заранее отрендеренного снимка;
+    запросы с фильтрами обрабатываются как обычно.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        snapshot = get_catalog_snapshot(
+            self.get_queryset(), self.get_serializer_class()
+        )
+        gzipped = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if gzipped:
+            content, etag = snapshot.gzipped, snapshot.gzip_etag
+        else:
+            content, etag = snapshot.content, snapshot.etag
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(content, content_type='application/json')
+            if gzipped:
+                response['Content-Encoding'] = 'gzip'
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    def get_catalog_validator(self, request):
+        model = self.get_queryset().model
+        return (
+            f'{get_version(model_version_key(model))}:'
+            f'{request.get_full_path()}'
+        )
+
+    def get_list_validators(self, request):
+        return self.get_catalog_validator(request), None
+
+    def get_detail_validators(self, request):
+        return self.get_catalog_validator(request), None
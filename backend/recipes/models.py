@@ -1,15 +1,20 @@
-import random
-import string
-
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connections, models
+from django.db.models import Exists, OuterRef, Prefetch, Value
+from django.utils import timezone
 
+from recipes.cache import (bump_version_on_commit,
+                           invalidate_recipe_representations,
+                           model_version_key)
 from recipes.constants import (MAX_LENGTH_INGREDIENT_NAME,
                                MAX_LENGTH_MEASUREMENT_UNIT,
-                               MAX_LENGTH_RECIPE_NAME, MAX_LENGTH_SHORT_LINK,
-                               MAX_LENGTH_TAG_NAME, MIN_COOKING_TIME,
-                               MIN_INGREDIENT_AMOUNT)
+                               MAX_LENGTH_RECIPE_NAME, MAX_LENGTH_SEARCH_TERM,
+                               MAX_LENGTH_SHORT_LINK, MAX_LENGTH_TAG_NAME,
+                               MIN_COOKING_TIME, MIN_INGREDIENT_AMOUNT)
+from recipes.db import DerivedFieldsMixin
+from recipes.short_links import encode_short_link
 
 User = get_user_model()
 
@@ -55,7 +60,89 @@ class Ingredient(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+def get_recipe_prefetches():
+    """
+    Связи «многие» рецепта, необходимые для его представления.
+    Подгружаются фиксированным числом запросов на любое количество рецептов.
+    """
+    return (
+        'tags',
+        Prefetch(
+            'recipe_ingredients',
+            queryset=RecipeIngredient.objects.select_related('ingredient')
+        )
+    )
+
+
+class RecipeQuerySet(models.QuerySet):
+    def latest_by_author(self, author_ids, limit=None):
+        """
+        Возвращает словарь {id автора: последние рецепты автора}.
+        С limit выбирает не более limit рецептов на каждого автора одним
+        запросом с ROW_NUMBER() OVER (PARTITION BY author_id).
+        Загружаются только поля краткого представления рецепта.
+        """
+        recipes_by_author = {author_id: [] for author_id in author_ids}
+        if not recipes_by_author:
+            return recipes_by_author
+        if limit is None:
+            recipes = self.filter(author_id__in=author_ids).only(
+                'id', 'name', 'image', 'cooking_time', 'author_id'
+            ).order_by('-pub_date', '-id')
+        else:
+            quote_name = connections[self.db].ops.quote_name
+            placeholders = ', '.join(['%s'] * len(recipes_by_author))
+            recipes = self.raw(
+                'SELECT id, name, image, cooking_time, author_id FROM ('
+                '    SELECT id, name, image, cooking_time, author_id,'
+                '        ROW_NUMBER() OVER ('
+                '            PARTITION BY author_id'
+                '            ORDER BY pub_date DESC, id DESC'
+                '        ) AS row_number'
+                f'    FROM {quote_name(self.model._meta.db_table)}'
+                f'    WHERE author_id IN ({placeholders})'
+                ') AS ranked WHERE row_number <= %s '
+                'ORDER BY author_id, row_number',
+                [*recipes_by_author, limit]
+            )
+        for recipe in recipes:
+            recipes_by_author[recipe.author_id].append(recipe)
+        return recipes_by_author
+
+    def touch(self):
+        """
+        Отмечает рецепты изменёнными при правке связанных объектов:
+        обновляет updated_at, версию рецептов и сбрасывает закешированные
+        представления.
+        """
+        recipe_ids = list(self.values_list('pk', flat=True))
+        if recipe_ids:
+            self.model.objects.filter(pk__in=recipe_ids).update(
+                updated_at=timezone.now()
+            )
+            invalidate_recipe_representations(recipe_ids)
+            bump_version_on_commit(model_version_key(self.model))
+
+    def with_user_flags(self, user):
+        """Аннотирует флаги is_favorited и is_in_shopping_cart."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False, output_field=models.BooleanField()),
+                is_in_shopping_cart=Value(
+                    False, output_field=models.BooleanField()
+                )
+            )
+        return self.annotate(
+            is_favorited=Exists(FavoriteRecipe.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            ))
+        )
+
+
+class Recipe(DerivedFieldsMixin, models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -91,6 +178,10 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
     short_link = models.CharField(
         max_length=MAX_LENGTH_SHORT_LINK,
         unique=True,
@@ -98,6 +189,27 @@ class Recipe(models.Model):
         null=True,
         verbose_name='Короткая ссылка'
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        db_index=True,
+        verbose_name='Добавлений в избранное'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в корзину'
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    # Поля, которые обновляются только отдельными UPDATE.
+    DERIVED_FIELDS = ('favorites_count', 'in_carts_count', 'search_vector')
 
     class Meta:
         ordering = ['-pub_date']
@@ -107,21 +219,12 @@ class Recipe(models.Model):
     def __str__(self):
         return self.name
 
-    def save(self, *args, **kwargs):
-        if not self.short_link:
-            self.short_link = self.generate_short_link()
-        super().save(*args, **kwargs)
-
-    def generate_short_link(self):
+    def get_short_link(self):
         """
-        Генерирует уникальный короткий идентификатор для рецепта.
+        Старые рецепты хранят случайный код в short_link, у новых он
+        вычисляется из id.
         """
-        length = 4
-        characters = string.ascii_letters + string.digits
-        while True:
-            link = ''.join(random.choices(characters, k=length))
-            if not Recipe.objects.filter(short_link=link).exists():
-                return link
+        return self.short_link or encode_short_link(self.pk)
 
 
 class RecipeIngredient(models.Model):
@@ -153,6 +256,33 @@ class RecipeIngredient(models.Model):
         return f'{self.ingredient} - {self.recipe}'
 
 
+class RecipeSearchTerm(models.Model):
+    """
+    Инвертированный индекс для полнотекстового поиска рецептов на базах,
+    отличных от PostgreSQL (например, SQLite в тестах).
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Рецепт'
+    )
+    term = models.CharField(
+        max_length=MAX_LENGTH_SEARCH_TERM,
+        verbose_name='Основа слова'
+    )
+    weight = models.PositiveSmallIntegerField(verbose_name='Вес')
+
+    class Meta:
+        unique_together = ('term', 'recipe')
+        verbose_name = 'Поисковый термин'
+        verbose_name_plural = 'Поисковые термины'
+
+    def __str__(self):
+        return f'{self.term} - {self.recipe}'
+
+
 class BaseUserRecipeRelation(models.Model):
     user = models.ForeignKey(
         User,
@@ -214,3 +344,32 @@ class ShoppingCart(BaseUserRecipeRelation):
         unique_together = ('user', 'recipe')
         verbose_name = 'Рецепт в корзине'
         verbose_name_plural = 'Рецепты в корзине'
+
+
+class ShoppingListItem(models.Model):
+    """
+    Суммарное количество ингредиента в корзине пользователя.
+    Поддерживается при изменении корзины и состава рецептов в ней.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField(verbose_name='Количество')
+
+    class Meta:
+        unique_together = ('user', 'ingredient')
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списка покупок'
+
+    def __str__(self):
+        return f'{self.user} - {self.ingredient}'
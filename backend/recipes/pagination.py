@@ -1,5 +1,203 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import (EmptyPage, Page, PageNotAnInteger,
+                                   Paginator)
+from django.db import connection
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from django.utils.translation import gettext as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from recipes.cache import (get_version, model_version_key,
+                           user_version_key)
+from recipes.constants import COUNT_CACHE_TIMEOUT, ESTIMATED_COUNT_THRESHOLD
+
+
+class ExactCount:
+    """Точный COUNT(*) на каждый запрос."""
+
+    def __init__(self, request):
+        self.request = request
+
+    def count(self, object_list):
+        if isinstance(object_list, QuerySet):
+            return object_list.count()
+        return len(object_list)
+
+
+class CachedCount(ExactCount):
+    """
+    Точный COUNT(*), закешированный по сигнатуре фильтра на
+    COUNT_CACHE_TIMEOUT секунд. Ключ включает версию модели и версию
+    связей текущего пользователя, которые увеличиваются сигналами при
+    создании и удалении объектов.
+    """
+
+    def get_cache_key(self, queryset):
+        try:
+            query = str(queryset.order_by().values('pk').query)
+        except EmptyResultSet:
+            # Заведомо пустой queryset (none()) не компилируется в SQL.
+            return None
+        signature = hashlib.md5(query.encode()).hexdigest()
+        user = self.request.user
+        user_version = (
+            get_version(user_version_key(user.pk))
+            if user.is_authenticated else '-'
+        )
+        model_version = get_version(model_version_key(queryset.model))
+        return f'count:{model_version}:{user_version}:{signature}'
+
+    def count(self, object_list):
+        if not isinstance(object_list, QuerySet):
+            return len(object_list)
+        key = self.get_cache_key(object_list)
+        if key is None:
+            return object_list.count()
+        count = cache.get(key)
+        if count is None:
+            count = object_list.count()
+            cache.set(key, count, COUNT_CACHE_TIMEOUT)
+        return count
+
+
+class EstimatedCount(CachedCount):
+    """
+    Оценка планировщика PostgreSQL для списков без фильтров.
+    Небольшие таблицы и отфильтрованные списки считаются через CachedCount.
+    """
+
+    def estimate(self, queryset):
+        if connection.vendor != 'postgresql' or queryset.query.where:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        return int(row[0]) if row else None
+
+    def count(self, object_list):
+        if isinstance(object_list, QuerySet):
+            estimate = self.estimate(object_list)
+            if estimate is not None and estimate >= ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count(object_list)
+
+
+class CountingPage(Page):
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class CountingPaginator(Paginator):
+    """
+    Пагинатор, у которого count берётся из стратегии подсчёта и может
+    быть оценкой. Поэтому существование страницы и следующей страницы
+    определяется по самим данным: выбирается на одну строку больше
+    размера страницы.
+    """
+
+    def __init__(self, object_list, per_page, count_strategy, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_strategy = count_strategy
+        self.seen = 0
+
+    @cached_property
+    def reported_count(self):
+        return self.count_strategy.count(self.object_list)
+
+    @property
+    def count(self):
+        # Не меньше строк, которые уже видны на прочитанной странице.
+        return max(self.reported_count, self.seen)
+
+    @property
+    def num_pages(self):
+        return Paginator.num_pages.func(self)
+
+    def validate_number(self, number):
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(
+            self.object_list[bottom:bottom + self.per_page + 1]
+        )
+        has_next = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if not object_list and (
+            number > 1 or not self.allow_empty_first_page
+        ):
+            raise EmptyPage(_('That page contains no results'))
+        self.seen = bottom + len(object_list) + has_next
+        return CountingPage(object_list, number, self, has_next)
 
 
 class PageNumberLimitPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+    count_strategy_class = CachedCount
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_strategy = self.count_strategy_class(request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page):
+        return CountingPaginator(
+            object_list, per_page, count_strategy=self.count_strategy
+        )
+
+
+class RecipePageNumberPagination(PageNumberLimitPagination):
+    count_strategy_class = EstimatedCount
+
+
+class RecipeCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация ленты рецептов по ключу (-pub_date, -id).
+    Не выполняет COUNT(*) и OFFSET, страницы стабильны при добавлении
+    новых рецептов.
+    """
+
+    ordering = ('-pub_date', '-id')
+    page_size_query_param = 'limit'
+    mode_query_param = 'pagination'
+    mode = 'cursor'
+    # Порядок по релевантности поиска не совпадает с ключом курсора.
+    unsupported_query_params = ('search',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        for param in self.unsupported_query_params:
+            if request.query_params.get(param, '').strip():
+                raise ValidationError({param: [
+                    'Параметр не поддерживается вместе с '
+                    f'{self.mode_query_param}={self.mode}.'
+                ]})
+        return super().paginate_queryset(queryset, request, view)
+
+    @classmethod
+    def is_requested(cls, request):
+        """Курсорный режим включается параметром ?pagination=cursor
+        или наличием курсора в запросе."""
+        params = request.query_params
+        return (
+            cls.cursor_query_param in params
+            or params.get(cls.mode_query_param) == cls.mode
+        )
@@ -0,0 +1,16 @@
+from rest_framework.parsers import FileUploadParser
+
+
+class ImageUploadParser(FileUploadParser):
+    """
+    Принимает изображение телом запроса без base64 и multipart.
+    Файл попадает в request.data под ключом file; имя файла
+    необязательно.
+    """
+
+    media_type = 'image/*'
+
+    def get_filename(self, stream, media_type, parser_context):
+        return super().get_filename(
+            stream, media_type, parser_context
+        ) or 'uploaded'
@@ -0,0 +1,77 @@
+"""
+Соответствие коротких ссылок рецептам для редиректа /s/<code>/.
+
+Двухуровневый кеш: LRU в памяти процесса и общий кеш Django. В базу
+запрос уходит только при промахе обоих уровней. При удалении рецепта
+его ссылки удаляются из общего кеша и LRU текущего процесса; в LRU
+других процессов записи живут не дольше SHORT_LINK_LRU_TIMEOUT.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+from recipes.cache import cache_timeout
+from recipes.constants import (SHORT_LINK_CACHE_TIMEOUT, SHORT_LINK_LRU_SIZE,
+                               SHORT_LINK_LRU_TIMEOUT)
+from recipes.models import Recipe
+from recipes.short_links import decode_short_link, encode_short_link
+
+_lock = threading.Lock()
+_lru = OrderedDict()
+
+
+def short_link_cache_key(code):
+    return f'short_link:{code}'
+
+
+def remember(code, recipe_id):
+    with _lock:
+        _lru[code] = recipe_id, time.monotonic() + SHORT_LINK_LRU_TIMEOUT
+        _lru.move_to_end(code)
+        if len(_lru) > SHORT_LINK_LRU_SIZE:
+            _lru.popitem(last=False)
+
+
+def lookup_recipe_id(code):
+    recipe_id = decode_short_link(code)
+    if recipe_id is None:
+        recipes = Recipe.objects.filter(short_link=code)
+    else:
+        recipes = Recipe.objects.filter(pk=recipe_id)
+    return recipes.values_list('pk', flat=True).first()
+
+
+def resolve_short_link(code):
+    """Возвращает id рецепта по короткой ссылке или None."""
+    with _lock:
+        recipe_id, expires_at = _lru.get(code, (None, 0))
+        if recipe_id is not None:
+            if expires_at > time.monotonic():
+                _lru.move_to_end(code)
+                return recipe_id
+            del _lru[code]
+    key = short_link_cache_key(code)
+    recipe_id = cache.get(key)
+    if recipe_id is None:
+        recipe_id = lookup_recipe_id(code)
+        if recipe_id is None:
+            return None
+        cache.set(key, recipe_id, cache_timeout(SHORT_LINK_CACHE_TIMEOUT))
+    remember(code, recipe_id)
+    return recipe_id
+
+
+def forget_recipe_short_links(recipe):
+    codes = {encode_short_link(recipe.pk)}
+    if recipe.short_link:
+        codes.add(recipe.short_link)
+    cache.delete_many([short_link_cache_key(code) for code in codes])
+    with _lock:
+        for code in codes:
+            _lru.pop(code, None)
+
+
+def recipe_url(recipe_id, base_url):
+    return f'{base_url.rstrip("/")}/recipes/{recipe_id}/'
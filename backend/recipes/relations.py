@@ -0,0 +1,152 @@
+"""
+Массовое добавление рецептов в избранное и корзину, подписка на авторов
+и обратные операции.
+
+Изменения применяются в одной транзакции одним INSERT ... ON CONFLICT
+DO NOTHING и одним DELETE.
+Построчные сигналы при этом не срабатывают, поэтому их действия
+(версия данных пользователя, счётчики рецептов, список покупок)
+выполняются здесь сразу для всей пачки.
+"""
+from django.db import transaction
+
+from recipes.cache import bump_version, user_version_key
+from recipes.counters import buffer_counter
+from recipes.db import delete_relations, insert_ignore
+from recipes.models import Recipe, ShoppingCart
+from recipes.shopping_list_items import (add_to_shopping_list,
+                                         remove_from_shopping_list)
+from users.models import Subscription, User, refresh_subscribers_count
+
+ADDED = 'added'
+REMOVED = 'removed'
+ALREADY_ADDED = 'already_added'
+NOT_ADDED = 'not_added'
+NOT_FOUND = 'not_found'
+SUBSCRIBED = 'subscribed'
+ALREADY_SUBSCRIBED = 'already_subscribed'
+SELF_SUBSCRIPTION = 'self_subscription'
+UNSUBSCRIBED = 'unsubscribed'
+NOT_SUBSCRIBED = 'not_subscribed'
+
+
+def bulk_add_relations(user, recipe_ids, relation_model, counter_field):
+    """Возвращает {id рецепта: статус} в порядке recipe_ids."""
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    with transaction.atomic():
+        found = set(Recipe.objects.filter(
+            pk__in=recipe_ids
+        ).values_list('pk', flat=True))
+        existing = set(relation_model.objects.filter(
+            user=user, recipe_id__in=found
+        ).values_list('recipe_id', flat=True))
+        added = [
+            recipe_id for recipe_id in recipe_ids
+            if recipe_id in found and recipe_id not in existing
+        ]
+        if added:
+            inserted = insert_ignore(
+                [
+                    relation_model(user=user, recipe_id=recipe_id)
+                    for recipe_id in added
+                ],
+                returning='recipe'
+            )
+            # С RETURNING известно, какие строки вставлены на самом деле,
+            # а не параллельным запросом.
+            if inserted is not None:
+                existing.update(set(added) - set(inserted))
+                added = [
+                    recipe_id for recipe_id in added
+                    if recipe_id in inserted
+                ]
+        if added and relation_model is ShoppingCart:
+            add_to_shopping_list(user.id, added)
+    if added:
+        bump_version(user_version_key(user.id))
+        for recipe_id in added:
+            buffer_counter(recipe_id, counter_field, 1)
+    return {
+        recipe_id: (
+            NOT_FOUND if recipe_id not in found
+            else ALREADY_ADDED if recipe_id in existing
+            else ADDED
+        )
+        for recipe_id in recipe_ids
+    }
+
+
+def bulk_remove_relations(user, recipe_ids, relation_model, counter_field):
+    """Возвращает {id рецепта: статус} в порядке recipe_ids."""
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    with transaction.atomic():
+        removed = delete_relations(
+            relation_model, user.id, 'recipe', recipe_ids
+        )
+        if removed and relation_model is ShoppingCart:
+            remove_from_shopping_list(user.id, removed)
+    if removed:
+        bump_version(user_version_key(user.id))
+        for recipe_id in removed:
+            buffer_counter(recipe_id, counter_field, -1)
+    return {
+        recipe_id: REMOVED if recipe_id in removed else NOT_ADDED
+        for recipe_id in recipe_ids
+    }
+
+
+def bulk_subscribe(user, author_ids):
+    """Возвращает {id автора: статус} в порядке author_ids."""
+    author_ids = list(dict.fromkeys(author_ids))
+    with transaction.atomic():
+        found = set(User.objects.filter(
+            pk__in=author_ids
+        ).values_list('pk', flat=True))
+        existing = set(Subscription.objects.filter(
+            user=user, author_id__in=found
+        ).values_list('author_id', flat=True))
+        subscribed = [
+            author_id for author_id in author_ids
+            if author_id in found
+            and author_id not in existing
+            and author_id != user.id
+        ]
+        if subscribed:
+            inserted = insert_ignore(
+                [
+                    Subscription(user=user, author_id=author_id)
+                    for author_id in subscribed
+                ],
+                returning='author'
+            )
+            if inserted is not None:
+                existing.update(set(subscribed) - set(inserted))
+            refresh_subscribers_count(subscribed)
+    if subscribed:
+        bump_version(user_version_key(user.id))
+    return {
+        author_id: (
+            NOT_FOUND if author_id not in found
+            else SELF_SUBSCRIPTION if author_id == user.id
+            else ALREADY_SUBSCRIBED if author_id in existing
+            else SUBSCRIBED
+        )
+        for author_id in author_ids
+    }
+
+
+def bulk_unsubscribe(user, author_ids):
+    """Возвращает {id автора: статус} в порядке author_ids."""
+    author_ids = list(dict.fromkeys(author_ids))
+    with transaction.atomic():
+        removed = delete_relations(
+            Subscription, user.id, 'author', author_ids
+        )
+        if removed:
+            refresh_subscribers_count(removed)
+    if removed:
+        bump_version(user_version_key(user.id))
+    return {
+        author_id: UNSUBSCRIBED if author_id in removed else NOT_SUBSCRIBED
+        for author_id in author_ids
+    }
@@ -0,0 +1,58 @@
+"""
+Быстрое построение представлений только для чтения.
+
+Функции собирают ту же структуру, что и сериализаторы DRF, напрямую из
+атрибутов объектов (с уже подгруженными связями), минуя обход полей
+сериализатора. Запись и валидация остаются на сериализаторах DRF.
+"""
+
+
+def media_url(file, request=None):
+    if not file:
+        return None
+    if request:
+        return request.build_absolute_uri(file.url)
+    return file.url
+
+
+def tag_representation(tag):
+    return {'id': tag.id, 'name': tag.name, 'slug': tag.slug}
+
+
+def ingredient_representation(ingredient):
+    return {
+        'id': ingredient.id,
+        'name': ingredient.name,
+        'measurement_unit': ingredient.measurement_unit,
+    }
+
+
+def recipe_ingredient_representation(recipe_ingredient):
+    ingredient = recipe_ingredient.ingredient
+    return {
+        'id': ingredient.id,
+        'name': ingredient.name,
+        'measurement_unit': ingredient.measurement_unit,
+        'amount': recipe_ingredient.amount,
+    }
+
+
+def user_representation(user, request=None, subscribed_ids=frozenset()):
+    return {
+        'email': user.email,
+        'id': user.id,
+        'username': user.username,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'is_subscribed': user.id in subscribed_ids,
+        'avatar': media_url(user.avatar, request),
+    }
+
+
+def short_recipe_representation(recipe, request=None):
+    return {
+        'id': recipe.id,
+        'name': recipe.name,
+        'image': media_url(recipe.image, request),
+        'cooking_time': recipe.cooking_time,
+    }
@@ -0,0 +1,133 @@
+"""
+Полнотекстовый поиск рецептов по названию и описанию.
+
+На PostgreSQL поиск идёт по поддерживаемому tsvector (конфигурация
+russian, GIN-индекс): название имеет вес A, описание — вес B. Если в базе
+установлено расширение pg_trgm, к результатам добавляются рецепты с
+похожим названием, что спасает от опечаток. На остальных базах
+используется переносимый инвертированный индекс RecipeSearchTerm с
+упрощённым стеммингом.
+"""
+import re
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, TrigramSimilarity)
+from django.db import connections
+from django.db.models import (Count, F, IntegerField, OuterRef, Q, Subquery,
+                              Sum, Value)
+
+from recipes.constants import MAX_LENGTH_SEARCH_TERM
+from recipes.models import Recipe, RecipeSearchTerm
+
+SEARCH_CONFIG = 'russian'
+NAME_WEIGHT = 3
+TEXT_WEIGHT = 1
+MIN_STEM_LENGTH = 3
+
+TOKEN_RE = re.compile(r'\w+')
+# Окончания и суффиксы, отсекаемые упрощённым стеммером, от длинных
+# к коротким.
+ENDINGS = sorted((
+    'ившись', 'ывшись', 'иями', 'ями', 'ами', 'ией', 'иях', 'ях', 'ах',
+    'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ой', 'ей', 'ий', 'ый', 'ое',
+    'ее', 'ая', 'яя', 'ую', 'юю', 'ом', 'ем', 'ам', 'ям', 'ов', 'ев', 'ью',
+    'ие', 'ия', 'ии', 'ость', 'ости', 'ать', 'ять', 'ить', 'еть', 'ешь',
+    'ет', 'ут', 'ют', 'ит', 'ат', 'ят', 'ла', 'ли', 'ло', 'а', 'я', 'о',
+    'е', 'и', 'ы', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+
+_trigram_available = {}
+
+
+def stem(word):
+    for ending in ENDINGS:
+        if (
+            word.endswith(ending)
+            and len(word) - len(ending) >= MIN_STEM_LENGTH
+        ):
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(value):
+    """Возвращает основы слов строки без повторов, в порядке появления."""
+    value = value.casefold().replace('ё', 'е')
+    return list(dict.fromkeys(
+        stem(word)[:MAX_LENGTH_SEARCH_TERM]
+        for word in TOKEN_RE.findall(value)
+    ))
+
+
+def is_postgresql(using):
+    return connections[using].vendor == 'postgresql'
+
+
+def has_trigram_support(using):
+    if using not in _trigram_available:
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+            )
+            _trigram_available[using] = cursor.fetchone() is not None
+    return _trigram_available[using]
+
+
+def update_search_index(recipe_ids, using='default'):
+    """Пересчитывает поисковый индекс для рецептов с данными id."""
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    recipes = Recipe.objects.using(using).filter(pk__in=recipe_ids)
+    if is_postgresql(using):
+        recipes.update(search_vector=(
+            SearchVector('name', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+        ))
+        return
+    terms = []
+    for recipe_id, name, text in recipes.values_list('id', 'name', 'text'):
+        weights = dict.fromkeys(tokenize(text), TEXT_WEIGHT)
+        for term in tokenize(name):
+            weights[term] = weights.get(term, 0) + NAME_WEIGHT
+        terms.extend(
+            RecipeSearchTerm(recipe_id=recipe_id, term=term, weight=weight)
+            for term, weight in weights.items()
+        )
+    RecipeSearchTerm.objects.using(using).filter(
+        recipe_id__in=recipe_ids
+    ).delete()
+    RecipeSearchTerm.objects.using(using).bulk_create(terms)
+
+
+def search_recipes(queryset, query):
+    """
+    Оставляет рецепты, подходящие под запрос, и аннотирует их
+    релевантностью search_rank.
+    """
+    if is_postgresql(queryset.db):
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        rank = SearchRank(F('search_vector'), search_query)
+        condition = Q(search_vector=search_query)
+        if has_trigram_support(queryset.db):
+            rank = rank + TrigramSimilarity('name', query)
+            condition |= Q(name__trigram_similar=query)
+        return queryset.annotate(
+            search_rank=rank
+        ).filter(condition)
+    terms = tokenize(query)
+    if not terms:
+        # Аннотация нужна и пустому результату: по ней сортирует фильтр.
+        return queryset.annotate(
+            search_rank=Value(0, output_field=IntegerField())
+        ).none()
+    # Как и websearch_to_tsquery, требуем совпадения всех слов запроса.
+    rank = RecipeSearchTerm.objects.filter(
+        recipe=OuterRef('pk'), term__in=terms
+    ).order_by().values('recipe').annotate(
+        matched=Count('term'), rank=Sum('weight')
+    ).filter(matched=len(terms)).values('rank')
+    return queryset.annotate(
+        search_rank=Subquery(rank, output_field=IntegerField())
+    ).filter(search_rank__isnull=False)
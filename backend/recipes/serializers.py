@@ -1,26 +1,59 @@
-import base64
+from collections import Counter
 
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
+from django.core.cache import cache
+from django.core.files.uploadedfile import UploadedFile
 from django.core.validators import MinValueValidator
+from django.db import transaction
+from django.db.models import Manager, prefetch_related_objects
 from rest_framework import serializers
-
+from rest_framework.settings import api_settings
+
+from recipes.cache import (bump_version_on_commit, cache_timeout,
+                           invalidate_recipe_representations,
+                           model_version_key, recipe_representation_key)
+from recipes.constants import (MAX_BULK_AUTHORS, MAX_BULK_RECIPES,
+                               RECIPE_CACHE_TIMEOUT)
+from recipes.counters import buffer_counter
+from recipes.db import create_ignoring_conflict
+from recipes.images import (ImageUploadError, check_uploaded_image,
+                            decode_base64_image, is_base64_image)
 from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
-                            RecipeIngredient, ShoppingCart, Tag)
+                            RecipeIngredient, ShoppingCart, Tag,
+                            get_recipe_prefetches)
+from recipes.representations import (ingredient_representation,
+                                     recipe_ingredient_representation,
+                                     short_recipe_representation,
+                                     tag_representation, user_representation)
+from recipes.shopping_list_items import (amount_changes,
+                                         change_shopping_lists_for_recipe)
 from users.models import Subscription
 
 User = get_user_model()
 
 
+def get_subscribed_author_ids(context):
+    """
+    Возвращает id авторов, на которых подписан текущий пользователь.
+    Загружается одним запросом и сохраняется в контексте сериализатора,
+    общем для вложенных сериализаторов.
+    """
+    if 'subscribed_author_ids' not in context:
+        request = context.get('request')
+        user = request.user if request else None
+        context['subscribed_author_ids'] = set(
+            Subscription.objects.filter(user=user).values_list(
+                'author_id', flat=True
+            )
+        ) if user and user.is_authenticated else set()
+    return context['subscribed_author_ids']
+
+
 class UserSerializer(serializers.ModelSerializer):
-    avatar = serializers.SerializerMethodField(
-        'get_avatar_url',
-        read_only=True,
-    )
-    is_subscribed = serializers.SerializerMethodField(
-        'get_is_subscribed',
-        read_only=True,
-    )
+    # Представление строит user_representation; поля объявлены, чтобы
+    # описать его и не принимать их на вход.
+    avatar = serializers.ImageField(read_only=True)
+    is_subscribed = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = User
@@ -34,19 +67,12 @@ class UserSerializer(serializers.ModelSerializer):
             'avatar'
         ]
 
-    def get_avatar_url(self, obj):
-        request = self.context.get('request')
-        if obj.avatar:
-            if request:
-                return request.build_absolute_uri(obj.avatar.url)
-            return obj.avatar.url
-        return None
-
-    def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        return user.is_authenticated and obj.subscribers.filter(
-            user=user
-        ).exists()
+    def to_representation(self, instance):
+        return user_representation(
+            instance,
+            self.context.get('request'),
+            get_subscribed_author_ids(self.context)
+        )
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -54,20 +80,33 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
         fields = ['id', 'name', 'slug']
 
+    def to_representation(self, instance):
+        return tag_representation(instance)
+
 
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = ['id', 'name', 'measurement_unit']
 
+    def to_representation(self, instance):
+        return ingredient_representation(instance)
+
 
 class Base64ImageField(serializers.ImageField):
+    """
+    Принимает изображение строкой data:image/...;base64,... или обычным
+    загруженным файлом (multipart или бинарное тело запроса).
+    """
+
     def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            img_data = base64.b64decode(imgstr)
-            data = ContentFile(img_data, name=f"uploaded.{ext}")
+        try:
+            if is_base64_image(data):
+                data = decode_base64_image(data)
+            elif isinstance(data, UploadedFile):
+                check_uploaded_image(data)
+        except ImageUploadError as error:
+            raise serializers.ValidationError(str(error))
         return super().to_internal_value(data)
 
 
@@ -88,12 +127,45 @@ class RecipeIngredientReadSerializer(serializers.ModelSerializer):
         model = RecipeIngredient
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
+    def to_representation(self, instance):
+        return recipe_ingredient_representation(instance)
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """
+    Достаёт общие части представлений рецептов из кеша одним запросом,
+    а для промахов подгружает связи одним набором запросов на страницу.
+    """
+
+    def to_representation(self, data):
+        recipes = list(data.all() if isinstance(data, Manager) else data)
+        keys = [recipe_representation_key(recipe.pk) for recipe in recipes]
+        cached = cache.get_many(keys)
+        missing = [
+            recipe for recipe, key in zip(recipes, keys) if key not in cached
+        ]
+        if missing:
+            prefetch_related_objects(
+                missing, 'author', *get_recipe_prefetches()
+            )
+            built = {
+                recipe_representation_key(recipe.pk):
+                    self.child.get_shared_representation(recipe)
+                for recipe in missing
+            }
+            cache.set_many(built, cache_timeout(RECIPE_CACHE_TIMEOUT))
+            cached.update(built)
+        return [
+            self.child.add_user_fields(recipe, cached[key])
+            for recipe, key in zip(recipes, keys)
+        ]
+
 
 class RecipeSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        write_only=True
     )
     ingredients = RecipeIngredientWriteSerializer(many=True, write_only=True)
     is_favorited = serializers.SerializerMethodField()
@@ -114,8 +186,11 @@ class RecipeSerializer(serializers.ModelSerializer):
             'text',
             'cooking_time'
         ]
+        list_serializer_class = RecipeListSerializer
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user
         return (
             user.is_authenticated
@@ -123,12 +198,54 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user
         return (
             user.is_authenticated
             and obj.in_shopping_cart.filter(user=user).exists()
         )
 
+    @staticmethod
+    def validate_ids(ids, model, duplicate_message, missing_message):
+        """
+        Проверяет список id одним запросом IN: без повторов и только
+        существующие объекты.
+        """
+        duplicates = sorted(
+            pk for pk, count in Counter(ids).items() if count > 1
+        )
+        if duplicates:
+            raise serializers.ValidationError(
+                f'{duplicate_message}: {", ".join(map(str, duplicates))}.'
+            )
+        existing = set(model.objects.filter(pk__in=ids).values_list(
+            'pk', flat=True
+        ))
+        missing = [pk for pk in ids if pk not in existing]
+        if missing:
+            raise serializers.ValidationError(
+                f'{missing_message}: {", ".join(map(str, missing))}.'
+            )
+
+    def validate_tags(self, value):
+        self.validate_ids(
+            value,
+            Tag,
+            'Теги не должны повторяться',
+            'Тегов не существует'
+        )
+        return value
+
+    def validate_ingredients(self, value):
+        self.validate_ids(
+            [item['id'] for item in value],
+            Ingredient,
+            'Ингредиенты не должны повторяться',
+            'Ингредиентов не существует'
+        )
+        return value
+
     @staticmethod
     def create_recipe_ingredients(recipe, ingredients_data):
         RecipeIngredient.objects.bulk_create([
@@ -139,40 +256,135 @@ class RecipeSerializer(serializers.ModelSerializer):
             )
             for item in ingredients_data
         ])
+        bump_version_on_commit(model_version_key(RecipeIngredient))
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         self.create_recipe_ingredients(recipe, ingredients_data)
+        invalidate_recipe_representations([recipe.pk])
         return recipe
 
+    @staticmethod
+    def update_recipe_ingredients(recipe, ingredients_data):
+        """
+        Приводит ингредиенты рецепта к ingredients_data, меняя только
+        отличающиеся строки. Возвращает изменения количеств
+        {id ингредиента: разница}.
+        """
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipe_ingredients.all()
+        }
+        amounts = {item['id']: item['amount'] for item in ingredients_data}
+        changes = amount_changes(
+            {
+                ingredient_id: recipe_ingredient.amount
+                for ingredient_id, recipe_ingredient in current.items()
+            },
+            amounts
+        )
+        to_create = [
+            RecipeIngredient(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
+            )
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in current
+        ]
+        to_update = []
+        for ingredient_id, amount in amounts.items():
+            recipe_ingredient = current.get(ingredient_id)
+            if recipe_ingredient and recipe_ingredient.amount != amount:
+                recipe_ingredient.amount = amount
+                to_update.append(recipe_ingredient)
+        to_delete = [
+            recipe_ingredient.pk
+            for ingredient_id, recipe_ingredient in current.items()
+            if ingredient_id not in amounts
+        ]
+        if to_delete:
+            RecipeIngredient.objects.filter(pk__in=to_delete).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+        if to_create:
+            RecipeIngredient.objects.bulk_create(to_create)
+        if changes:
+            bump_version_on_commit(model_version_key(RecipeIngredient))
+        return changes
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients_data = validated_data.pop('ingredients', None)
         tags_data = validated_data.pop('tags', None)
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-
         if tags_data is not None:
             instance.tags.set(tags_data)
 
         if ingredients_data is not None:
-            instance.recipe_ingredients.all().delete()
-            self.create_recipe_ingredients(instance, ingredients_data)
+            change_shopping_lists_for_recipe(
+                instance.pk,
+                self.update_recipe_ingredients(instance, ingredients_data)
+            )
+
+        # Сохраняем рецепт последним, чтобы updated_at был не раньше
+        # изменений тегов и ингредиентов.
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save()
         return instance
 
+    def get_shared_representation(self, instance):
+        """
+        Часть представления, общая для всех пользователей.
+        Ссылки на изображения хранятся относительными, пользовательские
+        флаги заполняются в add_user_fields.
+        """
+        return {
+            'id': instance.id,
+            'tags': [tag_representation(tag) for tag in instance.tags.all()],
+            'author': user_representation(instance.author),
+            'is_favorited': False,
+            'is_in_shopping_cart': False,
+            'name': instance.name,
+            'image': instance.image.url if instance.image else None,
+            'text': instance.text,
+            'cooking_time': instance.cooking_time,
+            'ingredients': [
+                recipe_ingredient_representation(recipe_ingredient)
+                for recipe_ingredient in instance.recipe_ingredients.all()
+            ],
+        }
+
+    def add_user_fields(self, instance, shared):
+        """Дополняет общее представление данными текущего запроса."""
+        request = self.context.get('request')
+        data = dict(shared)
+        data['author'] = author = dict(shared['author'])
+        author['is_subscribed'] = (
+            author['id'] in get_subscribed_author_ids(self.context)
+        )
+        if request:
+            for item, field in ((data, 'image'), (author, 'avatar')):
+                if item[field]:
+                    item[field] = request.build_absolute_uri(item[field])
+        data['is_favorited'] = self.get_is_favorited(instance)
+        data['is_in_shopping_cart'] = self.get_is_in_shopping_cart(instance)
+        return data
+
     def to_representation(self, instance):
         """Возвращаем представление с вложенными объектами вместо id."""
-        data = super().to_representation(instance)
-        data['tags'] = TagSerializer(instance.tags.all(), many=True).data
-        data['ingredients'] = RecipeIngredientReadSerializer(
-            instance.recipe_ingredients.all(),
-            many=True
-        ).data
-        return data
+        key = recipe_representation_key(instance.pk)
+        shared = cache.get(key)
+        if shared is None:
+            prefetch_related_objects(
+                [instance], 'author', *get_recipe_prefetches()
+            )
+            shared = self.get_shared_representation(instance)
+            cache.set(key, shared, cache_timeout(RECIPE_CACHE_TIMEOUT))
+        return self.add_user_fields(instance, shared)
 
 
 class RecipeReadSerializer(serializers.ModelSerializer):
@@ -203,12 +415,36 @@ class ShoppingCartAndFavoriteRecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
 
+    def to_representation(self, instance):
+        return short_recipe_representation(
+            instance, self.context.get('request')
+        )
+
+
+def get_recipes_limit(context):
+    recipes_limit = context['request'].query_params.get('recipes_limit')
+    if recipes_limit and recipes_limit.isdigit():
+        return int(recipes_limit)
+    return None
+
+
+class SubscriptionListSerializer(serializers.ListSerializer):
+    """Загружает последние рецепты всех авторов страницы одним запросом."""
+
+    def to_representation(self, data):
+        authors = list(data.all() if isinstance(data, Manager) else data)
+        self.context['latest_recipes'] = Recipe.objects.latest_by_author(
+            [author.id for author in authors],
+            get_recipes_limit(self.context)
+        )
+        return super().to_representation(authors)
+
 
 class SubscriptionSerializer(serializers.ModelSerializer):
     recipes = serializers.SerializerMethodField()
     recipes_count = serializers.IntegerField(read_only=True)
     avatar = serializers.ImageField(read_only=True)
-    is_subscribed = serializers.SerializerMethodField()
+    is_subscribed = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = User
@@ -223,31 +459,53 @@ class SubscriptionSerializer(serializers.ModelSerializer):
             'recipes_count',
             'avatar'
         )
+        list_serializer_class = SubscriptionListSerializer
 
-    def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        return (
-            user.is_authenticated
-            and obj.subscribers.filter(user=user).exists()
-        )
+    def to_representation(self, instance):
+        data = {
+            **user_representation(
+                instance,
+                self.context.get('request'),
+                get_subscribed_author_ids(self.context)
+            ),
+            'recipes': self.get_recipes(instance),
+            'recipes_count': instance.recipes_count,
+        }
+        return {field: data[field] for field in self.Meta.fields}
 
     def get_recipes(self, obj):
+        latest_recipes = self.context.get('latest_recipes')
+        if latest_recipes is None or obj.id not in latest_recipes:
+            latest_recipes = Recipe.objects.latest_by_author(
+                [obj.id], get_recipes_limit(self.context)
+            )
         request = self.context.get('request')
-        recipes_limit = request.query_params.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if recipes_limit and recipes_limit.isdigit():
-            recipes = recipes[:int(recipes_limit)]
-        return RecipeSerializer(
-            recipes,
-            many=True,
-            context={'request': request}
-        ).data
+        return [
+            short_recipe_representation(recipe, request)
+            for recipe in latest_recipes[obj.id]
+        ]
 
 
 class AvatarSerializer(serializers.Serializer):
     avatar = Base64ImageField(required=True)
 
 
+class RecipeImageSerializer(serializers.Serializer):
+    image = Base64ImageField(required=True)
+
+
+def create_relation(relation, duplicate_message):
+    """
+    Создаёт связь одним INSERT ... ON CONFLICT DO NOTHING; если такая
+    связь уже есть, отвечает той же ошибкой, что и проверка в validate.
+    """
+    if not create_ignoring_conflict(relation):
+        raise serializers.ValidationError(
+            {api_settings.NON_FIELD_ERRORS_KEY: [duplicate_message]}
+        )
+    return relation
+
+
 class SubscriptionCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Subscription
@@ -264,16 +522,15 @@ class SubscriptionCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 "Нельзя подписаться на самого себя."
             )
-        if Subscription.objects.filter(user=user, author=author).exists():
-            raise serializers.ValidationError(
-                "Вы уже подписаны на этого пользователя."
-            )
         return data
 
     def create(self, validated_data):
         user = self.context['request'].user
         author = self.context['author']
-        return Subscription.objects.create(user=user, author=author)
+        return create_relation(
+            Subscription(user=user, author=author),
+            "Вы уже подписаны на этого пользователя."
+        )
 
 
 class ShoppingCartCreateSerializer(serializers.ModelSerializer):
@@ -285,17 +542,14 @@ class ShoppingCartCreateSerializer(serializers.ModelSerializer):
             'recipe': {'read_only': True},
         }
 
-    def validate(self, data):
-        user = self.context['request'].user
-        recipe = self.context['recipe']
-        if ShoppingCart.objects.filter(user=user, recipe=recipe).exists():
-            raise serializers.ValidationError("Рецепт уже в корзине")
-        return data
-
     def create(self, validated_data):
         user = self.context['request'].user
         recipe = self.context['recipe']
-        return ShoppingCart.objects.create(user=user, recipe=recipe)
+        shopping_cart = create_relation(
+            ShoppingCart(user=user, recipe=recipe), "Рецепт уже в корзине"
+        )
+        buffer_counter(recipe.id, 'in_carts_count', 1)
+        return shopping_cart
 
 
 class FavoriteRecipeCreateSerializer(serializers.ModelSerializer):
@@ -307,14 +561,27 @@ class FavoriteRecipeCreateSerializer(serializers.ModelSerializer):
             'recipe': {'read_only': True},
         }
 
-    def validate(self, data):
-        user = self.context['request'].user
-        recipe = self.context['recipe']
-        if FavoriteRecipe.objects.filter(user=user, recipe=recipe).exists():
-            raise serializers.ValidationError("Рецепт уже в избранном.")
-        return data
-
     def create(self, validated_data):
         user = self.context['request'].user
         recipe = self.context['recipe']
-        return FavoriteRecipe.objects.create(user=user, recipe=recipe)
+        favorite = create_relation(
+            FavoriteRecipe(user=user, recipe=recipe), "Рецепт уже в избранном."
+        )
+        buffer_counter(recipe.id, 'favorites_count', 1)
+        return favorite
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BULK_RECIPES
+    )
+
+
+class AuthorIdsSerializer(serializers.Serializer):
+    authors = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BULK_AUTHORS
+    )
@@ -0,0 +1,139 @@
+"""
+Файлы списка покупок, которые рендерятся в пуле процессов.
+
+Готовый файл кешируется под ключом, построенным по содержимому корзины
+(id рецептов и время их изменения), поэтому повторная выгрузка отдаётся
+сразу, пока корзина и рецепты в ней не изменятся. Пока файл рендерится,
+вызывающий код получает None и может попросить клиента повторить запрос.
+Если пул сломан (например, воркер убит из-за нехватки памяти), он
+пересоздаётся.
+"""
+import hashlib
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+
+from recipes.constants import (SHOPPING_LIST_CACHE_TIMEOUT,
+                               SHOPPING_LIST_CHUNK_SIZE,
+                               SHOPPING_LIST_WAIT_TIMEOUT)
+from recipes.exporters import render_csv, render_pdf
+from recipes.models import Recipe, ShoppingListItem
+
+_lock = threading.Lock()
+_executor = None
+_pending = {}
+
+
+def get_shopping_list_items(user):
+    """Ингредиенты корзины пользователя: (название, единица, количество)."""
+    return ShoppingListItem.objects.filter(user=user).order_by(
+        'ingredient__name'
+    ).values_list(
+        'ingredient__name', 'ingredient__measurement_unit', 'amount'
+    )
+
+
+def iter_shopping_list_lines(user):
+    """
+    Строки текстового списка покупок. Позиции читаются серверным курсором
+    по мере отправки ответа, а не загружаются в память целиком.
+    """
+    empty = True
+    items = get_shopping_list_items(user).iterator(
+        chunk_size=SHOPPING_LIST_CHUNK_SIZE
+    )
+    for name, measurement_unit, amount in items:
+        prefix = '' if empty else '\n'
+        empty = False
+        yield f'{prefix}{name} ({measurement_unit}) — {amount}'
+    if empty:
+        yield 'Список покупок пуст.'
+
+
+def shopping_list_cache_key(user, file_format):
+    cart = Recipe.objects.filter(
+        in_shopping_cart__user=user
+    ).order_by('pk').values_list('pk', 'updated_at')
+    digest = hashlib.md5(
+        ';'.join(f'{pk}:{updated_at}' for pk, updated_at in cart).encode()
+    ).hexdigest()
+    return f'shopping_list:{file_format}:{digest}'
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        # spawn вместо fork: процесс gunicorn многопоточный, а рендерам
+        # не нужно ничего, кроме модуля recipes.exporters.
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.SHOPPING_LIST_WORKERS,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _executor
+
+
+def discard_executor(executor):
+    """Убирает сломанный пул; следующий get_executor создаст новый."""
+    global _executor
+    if _executor is executor:
+        _executor = None
+    executor.shutdown(wait=False)
+
+
+def submit_render(executor, items, file_format):
+    if file_format == 'pdf':
+        return executor.submit(
+            render_pdf, items, settings.SHOPPING_LIST_PDF_FONT
+        )
+    return executor.submit(render_csv, items)
+
+
+def store_result(key, future):
+    with _lock:
+        _pending.pop(key, None)
+    if future.exception() is None:
+        cache.set(key, future.result(), SHOPPING_LIST_CACHE_TIMEOUT)
+
+
+def get_shopping_list_file(user, file_format):
+    """
+    Возвращает содержимое файла списка покупок в формате pdf или csv
+    либо None, если файл ещё рендерится.
+    """
+    key = shopping_list_cache_key(user, file_format)
+    content = cache.get(key)
+    if content is not None:
+        return content
+    with _lock:
+        submitted = key not in _pending
+        if submitted:
+            items = list(get_shopping_list_items(user))
+            executor = get_executor()
+            try:
+                future = submit_render(executor, items, file_format)
+            except BrokenProcessPool:
+                discard_executor(executor)
+                executor = get_executor()
+                future = submit_render(executor, items, file_format)
+            _pending[key] = executor, future
+        else:
+            executor, future = _pending[key]
+    if submitted:
+        # Колбэк уже завершённой задачи вызывается сразу в этом потоке,
+        # поэтому он регистрируется вне блокировки.
+        future.add_done_callback(partial(store_result, key))
+    try:
+        return future.result(timeout=SHOPPING_LIST_WAIT_TIMEOUT)
+    except TimeoutError:
+        return None
+    except BrokenProcessPool:
+        # Задача потеряна вместе с пулом; повторный запрос клиента
+        # отрендерит файл в новом пуле.
+        with _lock:
+            discard_executor(executor)
+        return None
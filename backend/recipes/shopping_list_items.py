@@ -0,0 +1,172 @@
+"""
+Поддержка материализованного списка покупок ShoppingListItem.
+
+Добавление и удаление рецепта из корзины меняют количества одним UPDATE
+с CASE по ингредиентам. При изменении состава рецепта разница старых и
+новых количеств так же применяется сразу ко всем пользователям, у
+которых рецепт в корзине; агрегат по корзинам при этом не считается.
+"""
+from django.db import connections, router, transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from recipes.models import (Ingredient, RecipeIngredient, ShoppingCart,
+                            ShoppingListItem, User)
+
+
+def recipe_amounts(recipe_ids):
+    """Возвращает {id ингредиента: суммарное количество} по рецептам."""
+    return dict(RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by().values('ingredient').annotate(
+        total=Sum('amount')
+    ).values_list('ingredient', 'total'))
+
+
+def create_missing_items(users, ingredient_ids):
+    """
+    Создаёт нулевые строки списка покупок для пар пользователь-ингредиент
+    одним INSERT ... SELECT, пропуская существующие. Строки создаются
+    заранее, чтобы параллельные добавления сходились в одном UPDATE, а не
+    конфликтовали на вставке.
+    """
+    opts = ShoppingListItem._meta
+    connection = connections[router.db_for_write(ShoppingListItem)]
+    quote_name = connection.ops.quote_name
+    users_sql, users_params = users.values('pk').query.sql_with_params()
+    user_pk = '{}.{}'.format(
+        quote_name(User._meta.db_table), quote_name(User._meta.pk.column)
+    )
+    ingredient_pk = '{}.{}'.format(
+        quote_name(Ingredient._meta.db_table),
+        quote_name(Ingredient._meta.pk.column)
+    )
+    sql = (
+        '{} {} ({}, {}, {}) SELECT {}, {}, 0 FROM {}, {} '
+        'WHERE {} IN ({}) AND {} IN ({}) {}'
+    ).format(
+        connection.ops.insert_statement(ignore_conflicts=True),
+        quote_name(opts.db_table),
+        quote_name(opts.get_field('user').column),
+        quote_name(opts.get_field('ingredient').column),
+        quote_name(opts.get_field('amount').column),
+        user_pk,
+        ingredient_pk,
+        quote_name(User._meta.db_table),
+        quote_name(Ingredient._meta.db_table),
+        user_pk,
+        users_sql,
+        ingredient_pk,
+        ', '.join(['%s'] * len(ingredient_ids)),
+        connection.ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*users_params, *ingredient_ids])
+
+
+def apply_amount_changes(users, changes):
+    """
+    Прибавляет к спискам покупок пользователей users изменения
+    {id ингредиента: разница}. Количество не опускается ниже нуля,
+    обнулившиеся позиции удаляются.
+    """
+    changes = {
+        ingredient_id: delta
+        for ingredient_id, delta in changes.items() if delta
+    }
+    if not changes:
+        return
+    added = [
+        ingredient_id for ingredient_id, delta in changes.items() if delta > 0
+    ]
+    if added:
+        create_missing_items(users, added)
+    items = ShoppingListItem.objects.filter(
+        user__in=users.values('pk'), ingredient_id__in=changes
+    )
+    items.update(amount=Greatest(
+        F('amount') + Case(
+            *[
+                When(ingredient_id=ingredient_id, then=Value(delta))
+                for ingredient_id, delta in changes.items()
+            ],
+            default=Value(0),
+            output_field=IntegerField()
+        ),
+        Value(0)
+    ))
+    if len(added) < len(changes):
+        items.filter(amount=0).delete()
+
+
+def change_shopping_list(user_id, recipe_ids, sign):
+    apply_amount_changes(User.objects.filter(pk=user_id), {
+        ingredient_id: sign * amount
+        for ingredient_id, amount in recipe_amounts(recipe_ids).items()
+    })
+
+
+def add_to_shopping_list(user_id, recipe_ids):
+    change_shopping_list(user_id, recipe_ids, 1)
+
+
+def remove_from_shopping_list(user_id, recipe_ids):
+    change_shopping_list(user_id, recipe_ids, -1)
+
+
+def live_shopping_lists(user_ids=None):
+    """
+    Агрегат по корзинам, из которого строится список покупок:
+    {(id пользователя, id ингредиента): количество}.
+    """
+    carts = ShoppingCart.objects.filter(
+        recipe__recipe_ingredients__isnull=False
+    )
+    if user_ids is not None:
+        carts = carts.filter(user_id__in=user_ids)
+    rows = carts.order_by().values(
+        'user', 'recipe__recipe_ingredients__ingredient'
+    ).annotate(
+        total=Sum('recipe__recipe_ingredients__amount')
+    ).values_list(
+        'user', 'recipe__recipe_ingredients__ingredient', 'total'
+    )
+    return {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in rows
+    }
+
+
+def rebuild_shopping_lists(user_ids):
+    """Пересчитывает списки покупок пользователей из корзин."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    with transaction.atomic():
+        ShoppingListItem.objects.filter(user_id__in=user_ids).delete()
+        ShoppingListItem.objects.bulk_create([
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, amount=total
+            )
+            for (user_id, ingredient_id), total
+            in live_shopping_lists(user_ids).items()
+        ])
+
+
+def amount_changes(old, new):
+    """Разница количеств {id ингредиента: новое - старое}."""
+    return {
+        ingredient_id: new.get(ingredient_id, 0) - old.get(ingredient_id, 0)
+        for ingredient_id in old.keys() | new.keys()
+        if new.get(ingredient_id, 0) != old.get(ingredient_id, 0)
+    }
+
+
+def change_shopping_lists_for_recipe(recipe_id, changes):
+    """
+    Применяет изменение состава рецепта {id ингредиента: разница} к
+    спискам покупок всех пользователей, у которых он в корзине.
+    """
+    apply_amount_changes(
+        User.objects.filter(shopping_cart__recipe_id=recipe_id), changes
+    )
@@ -0,0 +1,43 @@
+"""
+Короткие ссылки на рецепты.
+
+Ссылка — это id рецепта в base62, сдвинутый так, чтобы код занимал не
+меньше SHORT_LINK_MIN_LENGTH символов. Она вычисляется без запросов
+к базе, не может совпасть ни с другой такой же ссылкой, ни со старыми
+случайными 4-символьными, и сама удлиняется с ростом числа рецептов.
+Коды, которые не могут быть построены из id рецепта (слишком длинные
+или дающие id вне диапазона BigAutoField), не декодируются.
+"""
+from recipes.constants import (MAX_RECIPE_ID, SHORT_LINK_ALPHABET,
+                               SHORT_LINK_MIN_LENGTH)
+
+BASE = len(SHORT_LINK_ALPHABET)
+OFFSET = BASE ** (SHORT_LINK_MIN_LENGTH - 1)
+DIGITS = {char: value for value, char in enumerate(SHORT_LINK_ALPHABET)}
+
+
+def encode_short_link(recipe_id):
+    value = recipe_id + OFFSET
+    chars = []
+    while value:
+        value, digit = divmod(value, BASE)
+        chars.append(SHORT_LINK_ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def decode_short_link(code):
+    """Возвращает id рецепта или None, если код не построен из id."""
+    if not SHORT_LINK_MIN_LENGTH <= len(code) <= MAX_LENGTH:
+        return None
+    value = 0
+    for char in code:
+        if char not in DIGITS:
+            return None
+        value = value * BASE + DIGITS[char]
+    recipe_id = value - OFFSET
+    if not 1 <= recipe_id <= MAX_RECIPE_ID:
+        return None
+    return recipe_id
+
+
+MAX_LENGTH = len(encode_short_link(MAX_RECIPE_ID))
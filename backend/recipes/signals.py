@@ -0,0 +1,171 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from recipes.cache import (bump_version, bump_version_on_commit,
+                           invalidate_recipe_representations,
+                           model_version_key, user_version_key)
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, Tag)
+from recipes.redirects import forget_recipe_short_links
+from recipes.search import update_search_index
+from recipes.shopping_list_items import (add_to_shopping_list,
+                                         remove_from_shopping_list)
+from users.models import Subscription, adjust_counter
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def bump_model_version_on_create(sender, instance, created, **kwargs):
+    if created:
+        bump_version(model_version_key(sender))
+
+
+@receiver(post_delete, sender=User)
+def bump_model_version_on_delete(sender, instance, **kwargs):
+    bump_version(model_version_key(sender))
+
+
+# Версия рецептов входит в ETag списка, поэтому меняется при любой
+# правке рецепта, а не только при создании и удалении.
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def bump_recipe_version(sender, instance, **kwargs):
+    bump_version_on_commit(model_version_key(Recipe))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipe_version_on_tags_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version_on_commit(model_version_key(Recipe))
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_index(sender, instance, update_fields, using,
+                               **kwargs):
+    if update_fields is None or {'name', 'text'} & set(update_fields):
+        update_search_index([instance.pk], using=using)
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=FavoriteRecipe)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Subscription)
+def bump_user_version(sender, instance, **kwargs):
+    bump_version(user_version_key(instance.user_id))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe(sender, instance, **kwargs):
+    invalidate_recipe_representations([instance.pk])
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def invalidate_recipe_on_ingredients_change(sender, instance, **kwargs):
+    invalidate_recipe_representations([instance.recipe_id])
+    bump_version_on_commit(model_version_key(RecipeIngredient))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_on_tags_change(sender, instance, action, reverse,
+                                     pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_recipe_representations([instance.pk])
+    elif action == 'pre_clear':
+        invalidate_recipe_representations(
+            instance.recipe_set.values_list('pk', flat=True)
+        )
+    else:
+        invalidate_recipe_representations(pk_set)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(post_save, sender=Tag)
+def touch_recipes_on_tag_change(sender, instance, **kwargs):
+    Recipe.objects.filter(tags=instance).touch()
+
+
+@receiver(pre_delete, sender=Ingredient)
+@receiver(post_save, sender=Ingredient)
+def touch_recipes_on_ingredient_change(sender, instance, **kwargs):
+    Recipe.objects.filter(ingredients=instance).touch()
+
+
+# Поля пользователя, которые выводятся в представлении автора рецепта.
+AUTHOR_FIELDS = ('email', 'username', 'first_name', 'last_name', 'avatar')
+
+
+def get_author_state(values):
+    return tuple(str(value or '') for value in values)
+
+
+@receiver(pre_save, sender=User)
+def detect_author_change(sender, instance, update_fields, **kwargs):
+    """
+    Запоминает, изменились ли выводимые в рецептах поля автора.
+    Вход в систему и смена пароля рецепты не затрагивают.
+    """
+    fields = [
+        field for field in AUTHOR_FIELDS
+        if update_fields is None or field in update_fields
+    ]
+    instance._author_changed = False
+    if instance._state.adding or not fields:
+        return
+    previous = sender.objects.filter(pk=instance.pk).values_list(
+        *fields
+    ).first()
+    instance._author_changed = previous is None or (
+        get_author_state(previous)
+        != get_author_state(getattr(instance, field) for field in fields)
+    )
+
+
+@receiver(post_save, sender=User)
+def touch_recipes_on_author_change(sender, instance, created, **kwargs):
+    if not created and getattr(instance, '_author_changed', False):
+        instance.recipes.touch()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def bump_catalog_version(sender, instance, **kwargs):
+    bump_version_on_commit(model_version_key(sender))
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        adjust_counter(instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    adjust_counter(instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_recipe_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        add_to_shopping_list(instance.user_id, [instance.recipe_id])
+
+
+# pre_delete: при каскадном удалении рецепта его ингредиенты ещё на месте.
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_recipe_from_shopping_list(sender, instance, **kwargs):
+    remove_from_shopping_list(instance.user_id, [instance.recipe_id])
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_short_links_on_delete(sender, instance, **kwargs):
+    forget_recipe_short_links(instance)
@@ -1,38 +1,70 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Sum
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404, redirect
+from django.http import (Http404, HttpResponse, HttpResponseRedirect,
+                         StreamingHttpResponse)
+from django.utils.cache import patch_cache_control
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import (NotFound, PermissionDenied,
                                        ValidationError)
 from rest_framework.filters import OrderingFilter
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 from rest_framework.status import (HTTP_200_OK, HTTP_201_CREATED,
-                                   HTTP_204_NO_CONTENT, HTTP_400_BAD_REQUEST,
-                                   HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND)
+                                   HTTP_202_ACCEPTED, HTTP_204_NO_CONTENT,
+                                   HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN,
+                                   HTTP_404_NOT_FOUND)
 
-from recipes.filters import IngredientFilter, RecipeFilter
+from recipes.cache import get_version, model_version_key
+from recipes.constants import (SHOPPING_LIST_RETRY_AFTER,
+                               SHORT_LINK_REDIRECT_MAX_AGE)
+from recipes.counters import buffer_counter
+from recipes.filters import (IngredientFilter, RecipeFilter,
+                             RecipeSearchFilter)
+from recipes.ingredient_index import get_ingredient_index
+from recipes.mixins import CatalogConditionalGetMixin, ConditionalGetMixin
 from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
                             RecipeIngredient, ShoppingCart, Tag)
-from recipes.pagination import PageNumberLimitPagination
-from recipes.serializers import (AvatarSerializer,
+from recipes.parsers import ImageUploadParser
+from recipes.pagination import (PageNumberLimitPagination,
+                                RecipeCursorPagination,
+                                RecipePageNumberPagination)
+from recipes.redirects import recipe_url, resolve_short_link
+from recipes.relations import (bulk_add_relations, bulk_remove_relations,
+                               bulk_subscribe, bulk_unsubscribe)
+from recipes.renderers import CSVRenderer, PDFRenderer, PlainTextRenderer
+from recipes.serializers import (AuthorIdsSerializer, AvatarSerializer,
                                  FavoriteRecipeCreateSerializer,
-                                 IngredientSerializer, RecipeSerializer,
+                                 IngredientSerializer, RecipeIdsSerializer,
+                                 RecipeImageSerializer, RecipeSerializer,
                                  ShoppingCartAndFavoriteRecipeSerializer,
                                  ShoppingCartCreateSerializer,
                                  SubscriptionCreateSerializer,
                                  SubscriptionSerializer, TagSerializer,
                                  UserSerializer)
+from recipes.shopping_list import (get_shopping_list_file,
+                                   iter_shopping_list_lines)
 from api.serializers import PasswordChangeSerializer, SignupSerializer
 from users.models import Subscription
 
 
 User = get_user_model()
 
+IMAGE_PARSERS = [JSONParser, MultiPartParser, ImageUploadParser]
+
+
+def get_image_data(request, field):
+    """
+    Данные для сериализатора изображения: при загрузке телом запроса
+    файл лежит под ключом file.
+    """
+    if field not in request.data and 'file' in request.data:
+        return {field: request.data['file']}
+    return request.data
+
 
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
@@ -62,12 +94,15 @@ class UserViewSet(viewsets.ModelViewSet):
         detail=False,
         methods=['put', 'delete'],
         permission_classes=[IsAuthenticated],
+        parser_classes=IMAGE_PARSERS,
         url_path='me/avatar'
     )
     def avatar(self, request):
         user = request.user
         if request.method == 'PUT':
-            serializer = AvatarSerializer(data=request.data)
+            serializer = AvatarSerializer(
+                data=get_image_data(request, 'avatar')
+            )
             if serializer.is_valid():
                 user.avatar = serializer.validated_data['avatar']
                 user.save()
@@ -106,9 +141,7 @@ class UserViewSet(viewsets.ModelViewSet):
     )
     def subscriptions(self, request):
         """Список пользователей, на которых подписан текущий пользователь."""
-        queryset = User.objects.filter(
-            subscribers__user=request.user
-        ).annotate(recipes_count=Count('recipes'))
+        queryset = User.objects.filter(subscribers__user=request.user)
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = SubscriptionSerializer(
@@ -158,15 +191,44 @@ class UserViewSet(viewsets.ModelViewSet):
                 status=HTTP_400_BAD_REQUEST,
             )
 
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='subscribe',
+        url_name='subscribe-bulk'
+    )
+    def subscribe_many(self, request):
+        """
+        Подписка на авторов из списка {"authors": [id, ...]} или отписка
+        от них. Возвращает статус по каждому id.
+        """
+        serializer = AuthorIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        bulk_change = (
+            bulk_subscribe if request.method == 'POST'
+            else bulk_unsubscribe
+        )
+        statuses = bulk_change(
+            request.user, serializer.validated_data['authors']
+        )
+        return Response(
+            [
+                {'id': author_id, 'status': status}
+                for author_id, status in statuses.items()
+            ],
+            status=HTTP_200_OK
+        )
+
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(CatalogConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all().order_by('id')
     serializer_class = TagSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     http_method_names = ['get']
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(CatalogConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Ingredient.objects.all().order_by('id')
     serializer_class = IngredientSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
@@ -174,19 +236,120 @@ class IngredientViewSet(viewsets.ModelViewSet):
     filter_backends = (DjangoFilterBackend, filters.SearchFilter)
     filterset_class = IngredientFilter
 
+    def get_list_validators(self, request):
+        etag_key, last_modified = super().get_list_validators(request)
+        if request.query_params.get('rank') == 'usage':
+            # Порядок зависит ещё и от состава рецептов.
+            etag_key = (
+                f'{etag_key}:'
+                f'{get_version(model_version_key(RecipeIngredient))}'
+            )
+        return etag_key, last_modified
+
+    def filter_queryset(self, queryset):
+        name = self.request.query_params.get('name')
+        if self.action != 'list' or name is None:
+            return super().filter_queryset(queryset)
+        # Поиск по имени обслуживается индексом в памяти, без запроса к БД.
+        by_usage = self.request.query_params.get('rank') == 'usage'
+        return get_ingredient_index(with_usage=by_usage).search(
+            name, by_usage=by_usage
+        )
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    pagination_class = PageNumberLimitPagination
-    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    pagination_class = RecipePageNumberPagination
+    filter_backends = [
+        DjangoFilterBackend,
+        OrderingFilter,
+        RecipeSearchFilter
+    ]
     filterset_class = RecipeFilter
-    ordering = ['-pub_date']
+    ordering = ['-pub_date', '-id']
+    ordering_fields = (
+        'id',
+        'pub_date',
+        'name',
+        'cooking_time',
+        'favorites_count',
+        'in_carts_count'
+    )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if RecipeCursorPagination.is_requested(self.request):
+                self._paginator = RecipeCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_queryset(self):
+        # Автор, теги и ингредиенты подгружаются сериализатором
+        # только для рецептов, которых нет в кеше представлений.
+        return Recipe.objects.defer('search_vector').with_user_flags(
+            self.request.user
+        )
+
+    def get_list_validators(self, request):
+        # Версия рецептов меняется при любой их правке, поэтому ETag
+        # строится без запросов к базе.
+        etag_key = (
+            f'{request.get_full_path()}:'
+            f'{get_version(model_version_key(Recipe))}:'
+            f'{self.get_user_validator(request)}'
+        )
+        return etag_key, None
+
+    def get_detail_validators(self, request):
+        pk = str(self.kwargs.get(self.lookup_field, ''))
+        if not pk.isdigit():
+            return None, None
+        updated_at = Recipe.objects.filter(pk=pk).values_list(
+            'updated_at', flat=True
+        ).first()
+        if updated_at is None:
+            return None, None
+        etag_key = f'{pk}:{updated_at}:{self.get_user_validator(request)}'
+        # Флаги пользователя не отражаются в дате изменения рецепта.
+        if request.user.is_authenticated:
+            return etag_key, None
+        return etag_key, updated_at
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @action(
+        detail=True,
+        methods=['put'],
+        permission_classes=[IsAuthenticated],
+        parser_classes=IMAGE_PARSERS,
+        url_path='image'
+    )
+    def image(self, request, pk=None):
+        """
+        Замена изображения рецепта: base64 в JSON, multipart или
+        бинарное тело запроса.
+        """
+        recipe = self.get_object()
+        if recipe.author != request.user:
+            raise PermissionDenied(
+                'У вас недостаточно прав для выполнения данного действия.'
+            )
+        serializer = RecipeImageSerializer(
+            data=get_image_data(request, 'image')
+        )
+        serializer.is_valid(raise_exception=True)
+        recipe.image = serializer.validated_data['image']
+        recipe.save(update_fields=['image', 'updated_at'])
+        return Response(
+            {'image': request.build_absolute_uri(recipe.image.url)},
+            status=HTTP_200_OK
+        )
+
     @action(
         detail=True,
         methods=['get'],
@@ -199,7 +362,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         Возвращает короткую ссылку для данного рецепта.
         """
         recipe = self.get_object()
-        relative_url = f"/s/{recipe.short_link}"
+        relative_url = f"/s/{recipe.get_short_link()}"
         full_url = request.build_absolute_uri(relative_url)
         return Response({"short-link": full_url}, status=HTTP_200_OK)
 
@@ -226,6 +389,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         request,
         recipe,
         relation_model,
+        counter_field,
         not_found_message
     ):
         deleted_count, _ = relation_model.objects.filter(
@@ -233,6 +397,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
             recipe=recipe
         ).delete()
         if deleted_count:
+            buffer_counter(recipe.id, counter_field, -1)
             return Response(status=HTTP_204_NO_CONTENT)
         else:
             return Response(
@@ -256,7 +421,11 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
         else:
             return RecipeViewSet.remove_recipe_relation(
-                request, recipe, ShoppingCart, 'Рецепта нет в корзине'
+                request,
+                recipe,
+                ShoppingCart,
+                'in_carts_count',
+                'Рецепта нет в корзине'
             )
 
     @action(
@@ -275,43 +444,99 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
         else:
             return RecipeViewSet.remove_recipe_relation(
-                request, recipe, FavoriteRecipe, 'Рецепт не в избранном.'
+                request,
+                recipe,
+                FavoriteRecipe,
+                'favorites_count',
+                'Рецепт не в избранном.'
             )
 
+    @staticmethod
+    def bulk_recipe_relations(request, relation_model, counter_field):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        bulk_change = (
+            bulk_add_relations if request.method == 'POST'
+            else bulk_remove_relations
+        )
+        statuses = bulk_change(
+            request.user,
+            serializer.validated_data['recipes'],
+            relation_model,
+            counter_field
+        )
+        return Response(
+            [
+                {'id': recipe_id, 'status': status}
+                for recipe_id, status in statuses.items()
+            ],
+            status=HTTP_200_OK
+        )
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk'
+    )
+    def bulk_shopping_cart(self, request):
+        """
+        Добавляет в корзину или удаляет из неё рецепты из списка
+        {"recipes": [id, ...]}. Возвращает статус по каждому id.
+        """
+        return RecipeViewSet.bulk_recipe_relations(
+            request, ShoppingCart, 'in_carts_count'
+        )
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='favorite',
+        url_name='favorite-bulk'
+    )
+    def bulk_favorite(self, request):
+        """То же, что bulk_shopping_cart, для избранного."""
+        return RecipeViewSet.bulk_recipe_relations(
+            request, FavoriteRecipe, 'favorites_count'
+        )
+
     @action(
         detail=False,
         methods=['get'],
-        permission_classes=[IsAuthenticated]
+        permission_classes=[IsAuthenticated],
+        renderer_classes=[PlainTextRenderer, CSVRenderer, PDFRenderer]
     )
     def download_shopping_cart(self, request):
-        user = request.user
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__in_shopping_cart__user=user
-        ).values(
-            'ingredient', 'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(
-            total_amount=Sum('amount')
-        ).order_by('ingredient__name')
-
-        lines = []
-        if not ingredients:
-            lines.append("Список покупок пуст.")
-        else:
-            for item in ingredients:
-                line = (
-                    f"{item['ingredient__name']} "
-                    f"({item['ingredient__measurement_unit']}) — "
-                    f"{item['total_amount']}"
+        """
+        Список покупок в формате ?format=txt (по умолчанию), csv или pdf.
+        csv и pdf рендерятся в пуле процессов; если файл не успел
+        подготовиться, возвращается 202 и клиент повторяет запрос.
+        """
+        file_format = request.accepted_renderer.format
+        if file_format != 'txt':
+            content = get_shopping_list_file(request.user, file_format)
+            if content is None:
+                return Response(
+                    {'detail': 'Список покупок готовится.'},
+                    status=HTTP_202_ACCEPTED,
+                    headers={'Retry-After': str(SHOPPING_LIST_RETRY_AFTER)}
                 )
-                lines.append(line)
-
-        text_content = "\n".join(lines)
-        response = HttpResponse(
-            text_content,
+            response = HttpResponse(
+                content, content_type=request.accepted_media_type
+            )
+            response['Content-Disposition'] = (
+                f'attachment; filename="shopping_list.{file_format}"'
+            )
+            return response
+        response = StreamingHttpResponse(
+            iter_shopping_list_lines(request.user),
             content_type='text/plain; charset=utf-8'
         )
-        response['Content-Disposition'] = 'attachment; '
-        'filename="shopping_list.txt"'
+        response['Content-Disposition'] = (
+            'attachment; filename="shopping_list.txt"'
+        )
         return response
 
     def partial_update(self, request, *args, **kwargs):
@@ -332,6 +557,13 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
 
 def redirect_short_link(request, short_link):
-    recipe = get_object_or_404(Recipe, short_link=short_link)
-    frontend_url = f'https://foodgramic.sytes.net/recipes/{recipe.id}/'
-    return redirect(frontend_url)
+    recipe_id = resolve_short_link(short_link)
+    if recipe_id is None:
+        raise Http404
+    response = HttpResponseRedirect(
+        recipe_url(recipe_id, settings.FRONTEND_URL)
+    )
+    patch_cache_control(
+        response, public=True, max_age=SHORT_LINK_REDIRECT_MAX_AGE
+    )
+    return response
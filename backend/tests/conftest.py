@@ -0,0 +1,127 @@
+import base64
+import io
+
+import pytest
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes import counters
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import User
+
+
+def make_png(size=2):
+    output = io.BytesIO()
+    Image.new('RGB', (size, size), 'red').save(output, 'PNG')
+    return output.getvalue()
+
+
+def make_data_url(content, subtype='png'):
+    return (
+        f'data:image/{subtype};base64,'
+        + base64.b64encode(content).decode()
+    )
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    cache.clear()
+    yield
+    counters.flush_counters()
+    cache.clear()
+
+
+@pytest.fixture
+def make_user(db):
+    def factory(username):
+        return User.objects.create_user(
+            email=f'{username}@example.com',
+            username=username,
+            first_name='Имя',
+            last_name='Фамилия',
+            password='pass-12345'
+        )
+    return factory
+
+
+@pytest.fixture
+def author(make_user):
+    return make_user('author')
+
+
+@pytest.fixture
+def reader(make_user):
+    return make_user('reader')
+
+
+def make_client(user=None):
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def anon_client():
+    return make_client()
+
+
+@pytest.fixture
+def author_client(author):
+    return make_client(author)
+
+
+@pytest.fixture
+def reader_client(reader):
+    return make_client(reader)
+
+
+@pytest.fixture
+def tags(db):
+    return [
+        Tag.objects.create(name=f'Тег {number}', slug=f'tag-{number}')
+        for number in range(3)
+    ]
+
+
+@pytest.fixture
+def ingredients(db):
+    return [
+        Ingredient.objects.create(
+            name=f'Ингредиент {number}', measurement_unit='г'
+        )
+        for number in range(5)
+    ]
+
+
+@pytest.fixture
+def make_recipe(tags, ingredients):
+    def factory(author, name='Рецепт', text='Описание', amounts=(10, 20)):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=name,
+            text=text,
+            cooking_time=5,
+            image=ContentFile(make_png(), name='recipe.png')
+        )
+        recipe.tags.set(tags[:2])
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(
+                recipe=recipe, ingredient=ingredient, amount=amount
+            )
+            for ingredient, amount in zip(ingredients, amounts)
+        ])
+        return recipe
+    return factory
+
+
+@pytest.fixture
+def recipe(author, make_recipe):
+    return make_recipe(author)
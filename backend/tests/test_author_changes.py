@@ -0,0 +1,32 @@
+import pytest
+from django.contrib.auth.models import update_last_login
+
+from recipes.models import Recipe
+
+
+def get_updated_at(recipe):
+    return Recipe.objects.values_list(
+        'updated_at', flat=True
+    ).get(pk=recipe.pk)
+
+
+@pytest.mark.django_db
+def test_login_and_password_change_do_not_touch_recipes(author, recipe):
+    updated_at = get_updated_at(recipe)
+    update_last_login(None, author)
+    author.set_password('new-pass-12345')
+    author.save()
+    assert get_updated_at(recipe) == updated_at
+
+
+@pytest.mark.django_db
+def test_rendered_author_change_touches_recipes(
+    author, recipe, anon_client
+):
+    updated_at = get_updated_at(recipe)
+    anon_client.get(f'/api/recipes/{recipe.id}/')
+    author.first_name = 'Новое имя'
+    author.save()
+    assert get_updated_at(recipe) > updated_at
+    response = anon_client.get(f'/api/recipes/{recipe.id}/')
+    assert response.data['author']['first_name'] == 'Новое имя'
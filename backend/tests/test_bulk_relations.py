@@ -0,0 +1,92 @@
+import pytest
+
+from recipes import counters
+from recipes.cache import get_version, user_version_key
+from recipes.models import (FavoriteRecipe, Recipe, ShoppingCart,
+                            ShoppingListItem)
+
+CART_URL = '/api/recipes/shopping_cart/'
+FAVORITE_URL = '/api/recipes/favorite/'
+
+
+@pytest.fixture
+def recipes(author, make_recipe):
+    return [
+        make_recipe(author, name=f'Рецепт {number}', amounts=(10,))
+        for number in range(3)
+    ]
+
+
+def statuses(response):
+    return {item['id']: item['status'] for item in response.data}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url, model, counter', (
+    (CART_URL, ShoppingCart, 'in_carts_count'),
+    (FAVORITE_URL, FavoriteRecipe, 'favorites_count'),
+))
+def test_bulk_add_and_remove(
+    reader, reader_client, recipes, url, model, counter
+):
+    first, second, third = recipes
+    model.objects.create(user=reader, recipe=first)
+    counters.flush_counters()
+    version = get_version(user_version_key(reader.id))
+    response = reader_client.post(
+        url, {'recipes': [first.id, second.id, 999999]}, format='json'
+    )
+    assert response.status_code == 200
+    assert statuses(response) == {
+        first.id: 'already_added', second.id: 'added', 999999: 'not_found'
+    }
+    assert set(model.objects.filter(user=reader).values_list(
+        'recipe_id', flat=True
+    )) == {first.id, second.id}
+    assert get_version(user_version_key(reader.id)) != version
+
+    response = reader_client.delete(
+        url, {'recipes': [second.id, third.id]}, format='json'
+    )
+    assert statuses(response) == {
+        second.id: 'removed', third.id: 'not_added'
+    }
+    assert list(model.objects.filter(user=reader).values_list(
+        'recipe_id', flat=True
+    )) == [first.id]
+    counters.flush_counters()
+    assert getattr(Recipe.objects.get(pk=second.pk), counter) == 0
+
+
+@pytest.mark.django_db
+def test_bulk_cart_updates_shopping_list(
+    reader, reader_client, recipes, ingredients
+):
+    ids = [recipe.id for recipe in recipes]
+    reader_client.post(CART_URL, {'recipes': ids}, format='json')
+    assert ShoppingListItem.objects.get(user=reader).amount == 30
+    reader_client.delete(CART_URL, {'recipes': ids[:2]}, format='json')
+    assert ShoppingListItem.objects.get(user=reader).amount == 10
+    reader_client.delete(CART_URL, {'recipes': ids}, format='json')
+    assert not ShoppingListItem.objects.filter(user=reader).exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('data', (
+    {},
+    {'recipes': []},
+    {'recipes': ['x']},
+    {'recipes': list(range(1, 1000))},
+))
+def test_bulk_rejects_invalid_payload(reader_client, data):
+    assert reader_client.post(
+        CART_URL, data, format='json'
+    ).status_code == 400
+
+
+@pytest.mark.django_db
+def test_bulk_requires_authentication(anon_client, recipes):
+    response = anon_client.post(
+        FAVORITE_URL, {'recipes': [recipes[0].id]}, format='json'
+    )
+    assert response.status_code == 401
@@ -0,0 +1,96 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from users.models import Subscription
+
+SUBSCRIBE_URL = '/api/users/subscribe/'
+
+
+@pytest.fixture
+def authors(make_user):
+    return [make_user(f'writer{number}') for number in range(3)]
+
+
+def statuses(response):
+    return {item['id']: item['status'] for item in response.data}
+
+
+def subscribed_ids(user):
+    return set(Subscription.objects.filter(user=user).values_list(
+        'author_id', flat=True
+    ))
+
+
+@pytest.mark.django_db
+def test_bulk_subscribe_and_unsubscribe(reader, reader_client, authors):
+    first, second, third = authors
+    Subscription.objects.create(user=reader, author=first)
+    response = reader_client.post(SUBSCRIBE_URL, {'authors': [
+        first.id, second.id, reader.id, 999999
+    ]}, format='json')
+    assert response.status_code == 200
+    assert statuses(response) == {
+        first.id: 'already_subscribed',
+        second.id: 'subscribed',
+        reader.id: 'self_subscription',
+        999999: 'not_found',
+    }
+    assert subscribed_ids(reader) == {first.id, second.id}
+    second.refresh_from_db()
+    assert second.subscribers_count == 1
+
+    response = reader_client.delete(
+        SUBSCRIBE_URL, {'authors': [second.id, third.id]}, format='json'
+    )
+    assert statuses(response) == {
+        second.id: 'unsubscribed', third.id: 'not_subscribed'
+    }
+    assert subscribed_ids(reader) == {first.id}
+    second.refresh_from_db()
+    assert second.subscribers_count == 0
+
+
+@pytest.mark.django_db
+def test_bulk_unsubscribe_changes_is_subscribed(
+    reader, reader_client, authors
+):
+    author = authors[0]
+    reader_client.post(SUBSCRIBE_URL, {'authors': [author.id]}, format='json')
+    url = f'/api/users/{author.id}/'
+    assert reader_client.get(url).data['is_subscribed'] is True
+    reader_client.delete(
+        SUBSCRIBE_URL, {'authors': [author.id]}, format='json'
+    )
+    assert reader_client.get(url).data['is_subscribed'] is False
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('extension', ('csv', 'jsonl'))
+def test_import_subscriptions(tmp_path, reader, authors, extension):
+    first, second, _ = authors
+    Subscription.objects.create(user=reader, author=first)
+    rows = [
+        (reader.email, first.id),
+        (reader.id, second.email),
+        (reader.id, reader.id),
+        ('missing@example.com', first.id),
+    ]
+    path = tmp_path / f'subscriptions.{extension}'
+    if extension == 'csv':
+        path.write_text('user,author\n' + ''.join(
+            f'{user},{author}\n' for user, author in rows
+        ), encoding='utf-8')
+    else:
+        path.write_text(''.join(
+            json.dumps({'user': user, 'author': author}) + '\n'
+            for user, author in rows
+        ), encoding='utf-8')
+    output = StringIO()
+    call_command('import_subscriptions', str(path), stdout=output)
+    assert 'создано 1 подписок' in output.getvalue()
+    assert subscribed_ids(reader) == {first.id, second.id}
+    second.refresh_from_db()
+    assert second.subscribers_count == 1
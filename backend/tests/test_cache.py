@@ -0,0 +1,33 @@
+from django.test import override_settings
+
+from recipes.cache import cache_timeout
+from recipes.checks import check_shared_cache
+from recipes.constants import LOCAL_CACHE_TIMEOUT
+
+SHARED_CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'LOCATION': '127.0.0.1:11211',
+}}
+
+
+def test_local_cache_entries_expire():
+    assert cache_timeout(None) == LOCAL_CACHE_TIMEOUT
+    assert cache_timeout(LOCAL_CACHE_TIMEOUT * 10) == LOCAL_CACHE_TIMEOUT
+    assert cache_timeout(1) == 1
+
+
+def test_shared_cache_timeouts_are_kept():
+    with override_settings(CACHES=SHARED_CACHES):
+        assert cache_timeout(None) is None
+        assert cache_timeout(LOCAL_CACHE_TIMEOUT * 10) == (
+            LOCAL_CACHE_TIMEOUT * 10
+        )
+
+
+@override_settings(DEBUG=False)
+def test_local_cache_is_reported_in_production():
+    assert [error.id for error in check_shared_cache(None)] == [
+        'recipes.W001'
+    ]
+    with override_settings(CACHES=SHARED_CACHES):
+        assert check_shared_cache(None) == []
@@ -0,0 +1,63 @@
+import gzip
+import json
+
+import pytest
+
+from recipes.models import Tag
+
+TAGS_URL = '/api/tags/'
+
+
+@pytest.mark.django_db
+def test_catalog_snapshot_content(anon_client, tags):
+    response = anon_client.get(TAGS_URL)
+    assert response.status_code == 200
+    assert json.loads(response.content) == [
+        {'id': tag.id, 'name': tag.name, 'slug': tag.slug} for tag in tags
+    ]
+    assert 'Accept-Encoding' in response['Vary']
+
+
+@pytest.mark.django_db
+def test_catalog_gzip_body_has_its_own_etag(anon_client, tags):
+    plain = anon_client.get(TAGS_URL)
+    compressed = anon_client.get(TAGS_URL, HTTP_ACCEPT_ENCODING='gzip')
+    assert compressed['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.content) == plain.content
+    assert compressed['ETag'] != plain['ETag']
+    assert not compressed['ETag'].startswith('W/')
+
+
+@pytest.mark.django_db
+def test_catalog_revalidation_matches_encoding(anon_client, tags):
+    plain_etag = anon_client.get(TAGS_URL)['ETag']
+    gzip_etag = anon_client.get(
+        TAGS_URL, HTTP_ACCEPT_ENCODING='gzip'
+    )['ETag']
+    assert anon_client.get(
+        TAGS_URL, HTTP_IF_NONE_MATCH=plain_etag
+    ).status_code == 304
+    assert anon_client.get(
+        TAGS_URL, HTTP_IF_NONE_MATCH=gzip_etag, HTTP_ACCEPT_ENCODING='gzip'
+    ).status_code == 304
+    response = anon_client.get(TAGS_URL, HTTP_IF_NONE_MATCH=gzip_etag)
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response
+
+
+@pytest.mark.django_db
+def test_catalog_snapshot_is_rebuilt_on_change(anon_client, tags):
+    etag = anon_client.get(TAGS_URL)['ETag']
+    Tag.objects.create(name='Новый', slug='new')
+    response = anon_client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert len(json.loads(response.content)) == len(tags) + 1
+
+
+@pytest.mark.django_db
+def test_filtered_catalog_request_is_served_normally(
+    anon_client, ingredients
+):
+    response = anon_client.get('/api/ingredients/', {'name': 'Ингредиент 1'})
+    assert response.status_code == 200
+    assert [item['id'] for item in response.data] == [ingredients[1].id]
@@ -0,0 +1,45 @@
+import pytest
+
+from recipes.models import FavoriteRecipe
+
+LIST_URL = '/api/recipes/'
+
+
+@pytest.mark.django_db
+def test_recipe_list_revalidation_does_not_query_database(
+    anon_client, recipe, django_assert_num_queries
+):
+    etag = anon_client.get(LIST_URL)['ETag']
+    with django_assert_num_queries(0):
+        response = anon_client.get(LIST_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+def test_recipe_list_etag_changes_on_recipe_edit(anon_client, recipe):
+    etag = anon_client.get(LIST_URL)['ETag']
+    recipe.name = 'Новое название'
+    recipe.save()
+    response = anon_client.get(LIST_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data['results'][0]['name'] == 'Новое название'
+
+
+@pytest.mark.django_db
+def test_recipe_list_etag_changes_on_user_flags(
+    reader, reader_client, recipe
+):
+    etag = reader_client.get(LIST_URL)['ETag']
+    FavoriteRecipe.objects.create(user=reader, recipe=recipe)
+    response = reader_client.get(LIST_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data['results'][0]['is_favorited'] is True
+
+
+@pytest.mark.django_db
+def test_recipe_list_etag_changes_on_tag_rename(anon_client, recipe, tags):
+    etag = anon_client.get(LIST_URL)['ETag']
+    tags[0].name = 'Переименованный тег'
+    tags[0].save()
+    response = anon_client.get(LIST_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
@@ -0,0 +1,34 @@
+import time
+
+import pytest
+
+from recipes import counters
+from recipes.models import Recipe
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.mark.django_db(transaction=True)
+def test_buffered_counters_are_flushed_by_timer(monkeypatch, recipe):
+    monkeypatch.setattr(counters, 'COUNTERS_FLUSH_INTERVAL', 0.2)
+    counters.flush_counters()
+    counters.buffer_counter(recipe.id, 'favorites_count', 1)
+    counters.buffer_counter(recipe.id, 'favorites_count', 1)
+    assert Recipe.objects.get(pk=recipe.pk).favorites_count == 0
+    assert wait_for(
+        lambda: Recipe.objects.get(pk=recipe.pk).favorites_count == 2
+    )
+
+
+@pytest.mark.django_db
+def test_counters_do_not_drop_below_zero(recipe):
+    counters.buffer_counter(recipe.id, 'in_carts_count', -3)
+    counters.flush_counters()
+    assert Recipe.objects.get(pk=recipe.pk).in_carts_count == 0
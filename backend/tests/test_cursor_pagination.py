@@ -0,0 +1,119 @@
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from recipes.models import FavoriteRecipe
+
+
+@pytest.fixture
+def recipes(author, make_recipe):
+    return [make_recipe(author, name=f'Рецепт {i}') for i in range(7)]
+
+
+def first_page(client, params=None):
+    return client.get(
+        '/api/recipes/', {'pagination': 'cursor', 'limit': 3, **(params or {})}
+    )
+
+
+def follow(client, link):
+    url = urlsplit(link)
+    return client.get(f'{url.path}?{url.query}')
+
+
+def walk(client, params=None, response=None):
+    """Обходит ленту по ссылкам next и возвращает id рецептов."""
+    response = response or first_page(client, params)
+    ids = []
+    while True:
+        assert response.status_code == 200
+        assert 'count' not in response.data
+        ids += [recipe['id'] for recipe in response.data['results']]
+        if response.data['next'] is None:
+            return ids
+        response = follow(client, response.data['next'])
+
+
+def newest_first(recipes):
+    return [recipe.id for recipe in sorted(
+        recipes, key=lambda recipe: (recipe.pub_date, recipe.id),
+        reverse=True
+    )]
+
+
+@pytest.mark.django_db
+def test_cursor_walks_whole_feed(anon_client, recipes):
+    assert walk(anon_client) == newest_first(recipes)
+
+
+@pytest.mark.django_db
+def test_pages_are_stable_while_recipes_are_added(
+    anon_client, author, recipes, make_recipe
+):
+    response = first_page(anon_client)
+    seen = [recipe['id'] for recipe in response.data['results']]
+    make_recipe(author, name='Новый 1')
+    make_recipe(author, name='Новый 2')
+    rest = walk(
+        anon_client, response=follow(anon_client, response.data['next'])
+    )
+    assert seen + rest == newest_first(recipes)
+
+
+@pytest.mark.django_db
+def test_tags_filter_has_no_duplicates(anon_client, recipes, tags):
+    # У каждого рецепта по два тега, оба входят в фильтр.
+    ids = walk(anon_client, {'tags': [tags[0].slug, tags[1].slug]})
+    assert ids == newest_first(recipes)
+
+
+@pytest.mark.django_db
+def test_author_filter(anon_client, reader, recipes, make_recipe):
+    other = make_recipe(reader, name='Чужой')
+    assert walk(anon_client, {'author': reader.id}) == [other.id]
+    assert walk(anon_client, {'author': recipes[0].author_id}) == (
+        newest_first(recipes)
+    )
+
+
+@pytest.mark.django_db
+def test_is_favorited_filter(reader, reader_client, recipes):
+    favorites = recipes[1:6:2]
+    for recipe in favorites:
+        FavoriteRecipe.objects.create(user=reader, recipe=recipe)
+    response_ids = walk(reader_client, {'is_favorited': 1})
+    assert response_ids == newest_first(favorites)
+
+
+@pytest.mark.django_db
+def test_cursor_param_alone_enables_cursor_mode(anon_client, recipes):
+    cursor = parse_qs(
+        urlsplit(first_page(anon_client).data['next']).query
+    )['cursor'][0]
+    response = anon_client.get('/api/recipes/', {'cursor': cursor})
+    assert response.status_code == 200
+    assert 'count' not in response.data
+
+
+@pytest.mark.django_db
+def test_page_number_contract_is_unchanged(anon_client, recipes):
+    response = anon_client.get('/api/recipes/', {'page': 2, 'limit': 3})
+    assert response.status_code == 200
+    assert set(response.data) == {'count', 'next', 'previous', 'results'}
+    assert response.data['count'] == 7
+    assert [recipe['id'] for recipe in response.data['results']] == (
+        newest_first(recipes)[3:6]
+    )
+    assert 'page=3' in response.data['next']
+    assert response.data['previous'] is not None
+
+
+@pytest.mark.django_db
+def test_search_is_rejected_in_cursor_mode(anon_client, recipes):
+    response = anon_client.get(
+        '/api/recipes/', {'pagination': 'cursor', 'search': 'рецепт'}
+    )
+    assert response.status_code == 400
+    assert 'search' in response.data
+    response = anon_client.get('/api/recipes/', {'search': 'рецепт'})
+    assert response.status_code == 200
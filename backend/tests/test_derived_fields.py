@@ -0,0 +1,36 @@
+import pytest
+
+from recipes.models import Recipe
+from users.models import User
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('model, fixture, edited, changes', (
+    (
+        User, 'author', 'first_name',
+        {'recipes_count': 7, 'subscribers_count': 3}
+    ),
+    (
+        Recipe, 'recipe', 'name',
+        {'favorites_count': 5, 'in_carts_count': 2}
+    ),
+))
+def test_full_save_keeps_derived_fields(
+    request, model, fixture, edited, changes
+):
+    instance = request.getfixturevalue(fixture)
+    stale = model.objects.get(pk=instance.pk)
+    model.objects.filter(pk=instance.pk).update(**changes)
+    setattr(stale, edited, 'Новое имя')
+    stale.save()
+    fresh = model.objects.get(pk=instance.pk)
+    assert getattr(fresh, edited) == 'Новое имя'
+    for field, value in changes.items():
+        assert getattr(fresh, field) == value
+
+
+@pytest.mark.django_db
+def test_explicit_update_fields_are_respected(author):
+    author.recipes_count = 42
+    author.save(update_fields=['recipes_count'])
+    assert User.objects.get(pk=author.pk).recipes_count == 42
@@ -0,0 +1,144 @@
+import base64
+
+import pytest
+from django.core.files.uploadedfile import (InMemoryUploadedFile,
+                                            SimpleUploadedFile,
+                                            TemporaryUploadedFile)
+from PIL import Image
+
+from recipes import images
+from recipes.images import ImageUploadError, decode_base64_image
+from tests.conftest import make_data_url, make_png
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # Сигнатура и переносы строк попадают на границы кусков.
+    monkeypatch.setattr(images, 'IMAGE_DECODE_CHUNK_SIZE', 8)
+
+
+def test_small_image_is_decoded_in_memory(small_chunks):
+    content = make_png()
+    uploaded = decode_base64_image(make_data_url(content))
+    assert isinstance(uploaded, InMemoryUploadedFile)
+    assert uploaded.read() == content
+    assert uploaded.size == len(content)
+    assert uploaded.name == 'uploaded.png'
+    assert uploaded.content_type == 'image/png'
+
+
+def test_large_image_is_decoded_to_temporary_file(settings, small_chunks):
+    settings.FILE_UPLOAD_MAX_MEMORY_SIZE = 10
+    content = make_png(size=64)
+    uploaded = decode_base64_image(make_data_url(content))
+    assert isinstance(uploaded, TemporaryUploadedFile)
+    assert uploaded.read() == content
+    uploaded.close()
+
+
+def test_base64_with_line_breaks_is_accepted(small_chunks):
+    content = make_png(size=16)
+    encoded = base64.encodebytes(content).decode()
+    assert '\n' in encoded
+    uploaded = decode_base64_image(f'data:image/png;base64,{encoded}')
+    assert uploaded.read() == content
+
+
+@pytest.mark.parametrize('data', (
+    'data:image/png;base64,iVBORw0K!!!',
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUg',
+    make_data_url(make_png())[:-3],
+))
+def test_malformed_base64_is_rejected(data):
+    with pytest.raises(ImageUploadError):
+        decode_base64_image(data)
+
+
+def test_non_image_is_rejected():
+    with pytest.raises(ImageUploadError):
+        decode_base64_image(make_data_url(b'%PDF-1.4 not an image'))
+
+
+def test_oversized_image_is_rejected_before_decoding(monkeypatch):
+    monkeypatch.setattr(images, 'MAX_IMAGE_UPLOAD_SIZE', 10)
+
+    def fail(*args):
+        raise AssertionError('данные не должны декодироваться')
+
+    monkeypatch.setattr(images, 'iter_base64_chunks', fail)
+    with pytest.raises(ImageUploadError):
+        decode_base64_image(make_data_url(make_png()))
+
+
+def read_image(path):
+    with Image.open(path) as image:
+        return image.format
+
+
+def put_recipe_image(client, recipe, **kwargs):
+    return client.put(f'/api/recipes/{recipe.id}/image/', **kwargs)
+
+
+@pytest.mark.django_db
+def test_recipe_image_as_raw_body(author_client, recipe):
+    response = put_recipe_image(
+        author_client, recipe, data=make_png(), content_type='image/png'
+    )
+    assert response.status_code == 200
+    recipe.refresh_from_db()
+    assert recipe.image.name.endswith('.png')
+    assert read_image(recipe.image.path) == 'PNG'
+
+
+@pytest.mark.django_db
+def test_recipe_image_as_multipart(author_client, recipe):
+    response = put_recipe_image(
+        author_client, recipe, format='multipart',
+        data={'image': SimpleUploadedFile('photo', make_png())}
+    )
+    assert response.status_code == 200
+    recipe.refresh_from_db()
+    assert read_image(recipe.image.path) == 'PNG'
+
+
+@pytest.mark.django_db
+def test_recipe_image_as_base64(author_client, recipe):
+    response = put_recipe_image(
+        author_client, recipe, format='json',
+        data={'image': make_data_url(make_png())}
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_raw_body_that_is_not_an_image_is_rejected(author_client, recipe):
+    response = put_recipe_image(
+        author_client, recipe, data=b'GIF-but-not-really',
+        content_type='image/png'
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_only_author_can_replace_recipe_image(reader_client, recipe):
+    response = put_recipe_image(
+        reader_client, recipe, data=make_png(), content_type='image/png'
+    )
+    assert response.status_code == 403
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('kwargs', (
+    {'data': make_png(), 'content_type': 'image/png'},
+    {
+        'format': 'multipart',
+        'data': {'avatar': SimpleUploadedFile('me.png', make_png())},
+    },
+    {'format': 'json', 'data': {'avatar': make_data_url(make_png())}},
+))
+def test_avatar_upload(reader, reader_client, kwargs):
+    response = reader_client.put('/api/users/me/avatar/', **kwargs)
+    assert response.status_code == 200
+    reader.refresh_from_db()
+    assert read_image(reader.avatar.path) == 'PNG'
+    assert response.data['avatar'].endswith(reader.avatar.url)
@@ -0,0 +1,102 @@
+import pytest
+
+from recipes import ingredient_index
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from tests.conftest import make_data_url, make_png
+
+NAMES = (
+    'Сахар', 'Ванильный сахар', 'Сахарная пудра', 'Соль', 'Мёд',
+    'Медовик', 'Тростниковый САХАР',
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    ingredient_index._index = None
+    yield
+    ingredient_index._index = None
+
+
+@pytest.fixture
+def catalog(db):
+    return {
+        name: Ingredient.objects.create(name=name, measurement_unit='г')
+        for name in NAMES
+    }
+
+
+def search(client, name, **params):
+    response = client.get('/api/ingredients/', {'name': name, **params})
+    assert response.status_code == 200
+    return [item['name'] for item in response.data]
+
+
+def use(recipe, *ingredients):
+    RecipeIngredient.objects.bulk_create([
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+        for ingredient in ingredients
+    ])
+
+
+@pytest.mark.django_db
+def test_prefix_matches_come_before_substring_matches(anon_client, catalog):
+    assert search(anon_client, 'сах') == [
+        'Сахар', 'Сахарная пудра', 'Ванильный сахар', 'Тростниковый САХАР'
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query', ('САХ', ' сах ', 'Сах'))
+def test_search_is_case_insensitive(anon_client, catalog, query):
+    assert search(anon_client, query)[:2] == ['Сахар', 'Сахарная пудра']
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query', ('мед', 'мёд', 'МЁД'))
+def test_yo_is_treated_as_ye(anon_client, catalog, query):
+    assert search(anon_client, query) == ['Мёд', 'Медовик']
+
+
+@pytest.mark.django_db
+def test_rank_by_usage_orders_each_group(
+    anon_client, author, make_recipe, catalog
+):
+    first = make_recipe(author, name='Первый', amounts=())
+    second = make_recipe(author, name='Второй', amounts=())
+    use(first, catalog['Сахарная пудра'], catalog['Тростниковый САХАР'])
+    use(second, catalog['Сахарная пудра'])
+    assert search(anon_client, 'сах', rank='usage') == [
+        'Сахарная пудра', 'Сахар', 'Тростниковый САХАР', 'Ванильный сахар'
+    ]
+
+
+@pytest.mark.django_db
+def test_usage_follows_recipe_changes(
+    anon_client, author, author_client, make_recipe, catalog, tags
+):
+    params = {'name': 'сах', 'rank': 'usage'}
+    use(make_recipe(author, amounts=()), catalog['Тростниковый САХАР'])
+    assert search(anon_client, **params)[2:] == [
+        'Тростниковый САХАР', 'Ванильный сахар'
+    ]
+    etag = anon_client.get('/api/ingredients/', params)['ETag']
+    for name in ('Другой', 'Третий'):
+        response = author_client.post('/api/recipes/', {
+            'name': name, 'text': 'Описание', 'cooking_time': 5,
+            'image': make_data_url(make_png()),
+            'tags': [tags[0].id],
+            'ingredients': [
+                {'id': catalog['Ванильный сахар'].id, 'amount': 1}
+            ],
+        }, format='json')
+        assert response.status_code == 201
+    assert anon_client.get(
+        '/api/ingredients/', params, HTTP_IF_NONE_MATCH=etag
+    ).status_code == 200
+    assert search(anon_client, **params)[2:] == [
+        'Ванильный сахар', 'Тростниковый САХАР'
+    ]
+    Recipe.objects.filter(name__in=('Другой', 'Третий')).delete()
+    assert search(anon_client, **params)[2:] == [
+        'Тростниковый САХАР', 'Ванильный сахар'
+    ]
@@ -0,0 +1,127 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes import serializers
+from recipes.models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+
+def recipe_rows(recipe):
+    return {
+        ingredient_id: (pk, amount)
+        for pk, ingredient_id, amount in RecipeIngredient.objects.filter(
+            recipe=recipe
+        ).values_list('pk', 'ingredient_id', 'amount')
+    }
+
+
+def patch_ingredients(client, recipe, amounts):
+    return client.patch(
+        f'/api/recipes/{recipe.id}/',
+        {'ingredients': [
+            {'id': ingredient.id, 'amount': amount}
+            for ingredient, amount in amounts
+        ]},
+        format='json'
+    )
+
+
+@pytest.fixture
+def refreshed(monkeypatch):
+    calls = []
+    change = serializers.change_shopping_lists_for_recipe
+
+    def record(recipe_id, changes):
+        if changes:
+            calls.append((recipe_id, changes))
+        change(recipe_id, changes)
+
+    monkeypatch.setattr(
+        serializers, 'change_shopping_lists_for_recipe', record
+    )
+    return calls
+
+
+@pytest.mark.django_db
+def test_changed_amount_updates_row_in_place(
+    author_client, recipe, ingredients, refreshed
+):
+    before = recipe_rows(recipe)
+    response = patch_ingredients(
+        author_client, recipe, [(ingredients[0], 10), (ingredients[1], 25)]
+    )
+    assert response.status_code == 200
+    after = recipe_rows(recipe)
+    assert after[ingredients[0].id] == before[ingredients[0].id]
+    assert after[ingredients[1].id] == (before[ingredients[1].id][0], 25)
+    assert refreshed == [(recipe.id, {ingredients[1].id: 5})]
+
+
+@pytest.mark.django_db
+def test_added_and_removed_ingredients(
+    author_client, recipe, ingredients, refreshed
+):
+    before = recipe_rows(recipe)
+    response = patch_ingredients(
+        author_client, recipe, [(ingredients[0], 10), (ingredients[2], 7)]
+    )
+    assert response.status_code == 200
+    after = recipe_rows(recipe)
+    assert set(after) == {ingredients[0].id, ingredients[2].id}
+    assert after[ingredients[0].id] == before[ingredients[0].id]
+    assert after[ingredients[2].id][1] == 7
+    assert [
+        (item['id'], item['amount']) for item in response.data['ingredients']
+    ] == [(ingredients[0].id, 10), (ingredients[2].id, 7)]
+    assert refreshed == [
+        (recipe.id, {ingredients[1].id: -20, ingredients[2].id: 7})
+    ]
+
+
+@pytest.mark.django_db
+def test_unchanged_ingredients_are_not_written(
+    author_client, recipe, ingredients, refreshed
+):
+    before = recipe_rows(recipe)
+    with CaptureQueriesContext(connection) as queries:
+        response = patch_ingredients(
+            author_client, recipe,
+            [(ingredients[0], 10), (ingredients[1], 20)]
+        )
+    assert response.status_code == 200
+    assert recipe_rows(recipe) == before
+    table = RecipeIngredient._meta.db_table
+    assert not [
+        query['sql'] for query in queries.captured_queries
+        if table in query['sql']
+        and query['sql'].lstrip().upper().startswith(
+            ('INSERT', 'UPDATE', 'DELETE')
+        )
+    ]
+    assert refreshed == []
+
+
+@pytest.mark.django_db
+def test_patch_without_ingredients_keeps_them(
+    author_client, recipe, refreshed
+):
+    before = recipe_rows(recipe)
+    response = author_client.patch(
+        f'/api/recipes/{recipe.id}/', {'name': 'Новое'}, format='json'
+    )
+    assert response.status_code == 200
+    assert recipe_rows(recipe) == before
+    assert refreshed == []
+
+
+@pytest.mark.django_db
+def test_shopping_lists_follow_ingredient_changes(
+    reader, author_client, recipe, ingredients
+):
+    ShoppingCart.objects.create(user=reader, recipe=recipe)
+    patch_ingredients(
+        author_client, recipe, [(ingredients[1], 3), (ingredients[3], 4)]
+    )
+    assert dict(ShoppingListItem.objects.filter(user=reader).values_list(
+        'ingredient_id', 'amount'
+    )) == {ingredients[1].id: 3, ingredients[3].id: 4}
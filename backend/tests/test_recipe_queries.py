@@ -0,0 +1,33 @@
+import pytest
+
+from recipes.models import FavoriteRecipe, ShoppingCart
+
+PAGE_SIZES = (6, 50, 200)
+
+
+@pytest.fixture
+def recipes(author, reader, make_recipe):
+    recipes = [
+        make_recipe(author, name=f'Рецепт {number}')
+        for number in range(max(PAGE_SIZES))
+    ]
+    FavoriteRecipe.objects.create(user=reader, recipe=recipes[0])
+    ShoppingCart.objects.create(user=reader, recipe=recipes[1])
+    return recipes
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('page_size', PAGE_SIZES)
+@pytest.mark.parametrize('client_name, expected_queries', (
+    ('anon_client', 6),
+    ('reader_client', 7),
+))
+def test_recipe_list_queries_do_not_depend_on_page_size(
+    request, recipes, page_size, client_name, expected_queries,
+    django_assert_num_queries
+):
+    client = request.getfixturevalue(client_name)
+    with django_assert_num_queries(expected_queries):
+        response = client.get('/api/recipes/', {'limit': page_size})
+    assert response.status_code == 200
+    assert len(response.data['results']) == page_size
@@ -0,0 +1,112 @@
+import pytest
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
+
+from recipes.models import Recipe, RecipeIngredient
+from recipes.serializers import RecipeSerializer
+from tests.conftest import make_data_url, make_png
+
+
+@pytest.fixture
+def payload(tags, ingredients):
+    return {
+        'name': 'Новый рецепт',
+        'text': 'Описание',
+        'cooking_time': 5,
+        'image': make_data_url(make_png()),
+        'tags': [tags[0].id, tags[1].id],
+        'ingredients': [
+            {'id': ingredients[0].id, 'amount': 10},
+            {'id': ingredients[1].id, 'amount': 20},
+        ],
+    }
+
+
+def post(client, payload):
+    return client.post('/api/recipes/', payload, format='json')
+
+
+@pytest.mark.django_db
+def test_valid_recipe_is_created(author_client, payload):
+    response = post(author_client, payload)
+    assert response.status_code == 201
+    assert RecipeIngredient.objects.filter(
+        recipe_id=response.data['id']
+    ).count() == 2
+
+
+@pytest.mark.django_db
+def test_duplicate_tags_are_rejected(author_client, payload, tags):
+    payload['tags'] = [tags[1].id, tags[0].id, tags[1].id, tags[0].id]
+    response = post(author_client, payload)
+    assert response.status_code == 400
+    assert response.data['tags'] == [
+        f'Теги не должны повторяться: {tags[0].id}, {tags[1].id}.'
+    ]
+    assert not Recipe.objects.exists()
+
+
+@pytest.mark.django_db
+def test_duplicate_ingredients_are_rejected(
+    author_client, payload, ingredients
+):
+    payload['ingredients'].append({'id': ingredients[0].id, 'amount': 1})
+    response = post(author_client, payload)
+    assert response.status_code == 400
+    assert response.data['ingredients'] == [
+        f'Ингредиенты не должны повторяться: {ingredients[0].id}.'
+    ]
+    assert not Recipe.objects.exists()
+
+
+@pytest.mark.django_db
+def test_unknown_ids_are_rejected(author_client, payload, tags, ingredients):
+    payload['tags'].append(tags[2].id + 1000)
+    payload['ingredients'].append(
+        {'id': ingredients[4].id + 1000, 'amount': 1}
+    )
+    response = post(author_client, payload)
+    assert response.status_code == 400
+    assert response.data['tags'] == [
+        f'Тегов не существует: {tags[2].id + 1000}.'
+    ]
+    assert response.data['ingredients'] == [
+        f'Ингредиентов не существует: {ingredients[4].id + 1000}.'
+    ]
+    assert not Recipe.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('value', ('x', None, [1, 'x']))
+def test_malformed_tag_ids_are_rejected(author_client, payload, value):
+    payload['tags'] = value
+    assert post(author_client, payload).status_code == 400
+    assert not Recipe.objects.exists()
+
+
+@pytest.mark.django_db
+def test_ids_are_checked_with_one_query(tags):
+    ids = [tag.id for tag in tags]
+    with CaptureQueriesContext(connection) as queries:
+        RecipeSerializer.validate_ids(ids, type(tags[0]), 'dup', 'missing')
+    assert len(queries) == 1
+
+
+def test_many_duplicates_are_reported_once():
+    with pytest.raises(ValidationError) as error:
+        RecipeSerializer.validate_ids(
+            list(range(5000)) * 2, None, 'Повторы', 'Нет'
+        )
+    assert str(error.value.detail[0]).startswith('Повторы: 0, 1, 2, ')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_failed_create_leaves_no_recipe(author_client, payload, monkeypatch):
+    def fail(*args, **kwargs):
+        raise IntegrityError('сбой вставки ингредиентов')
+
+    monkeypatch.setattr(RecipeSerializer, 'create_recipe_ingredients', fail)
+    with pytest.raises(IntegrityError):
+        post(author_client, payload)
+    assert not Recipe.objects.exists()
@@ -0,0 +1,53 @@
+import threading
+
+import pytest
+from django.db import connection
+
+from recipes.models import FavoriteRecipe, ShoppingCart
+from tests.conftest import make_client
+from users.models import Subscription
+
+THREADS = 8
+
+
+def hammer(user, url):
+    """Отправляет один и тот же POST из нескольких потоков одновременно."""
+    barrier = threading.Barrier(THREADS)
+    statuses = []
+
+    def worker():
+        client = make_client(user)
+        barrier.wait()
+        try:
+            statuses.append(client.post(url).status_code)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(statuses)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('url_name, model', (
+    ('favorite', FavoriteRecipe),
+    ('shopping_cart', ShoppingCart),
+))
+def test_concurrent_duplicate_recipe_relations(
+    reader, recipe, url_name, model
+):
+    statuses = hammer(reader, f'/api/recipes/{recipe.id}/{url_name}/')
+    assert statuses == [201] + [400] * (THREADS - 1)
+    assert model.objects.filter(user=reader, recipe=recipe).count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_duplicate_subscriptions(reader, author):
+    statuses = hammer(reader, f'/api/users/{author.id}/subscribe/')
+    assert statuses == [201] + [400] * (THREADS - 1)
+    assert Subscription.objects.filter(user=reader, author=author).count() == 1
+    author.refresh_from_db()
+    assert author.subscribers_count == 1
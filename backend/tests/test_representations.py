@@ -0,0 +1,180 @@
+"""
+Сверка быстрых представлений с прежними сериализаторами DRF.
+
+Эталонные сериализаторы ниже повторяют чтение в исходных
+RecipeSerializer, UserSerializer и SubscriptionSerializer, построенное
+на обходе полей ModelSerializer.
+"""
+import pytest
+from django.core.files.base import ContentFile
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from recipes.models import (FavoriteRecipe, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from tests.conftest import make_png
+from users.models import Subscription, User
+
+
+class ReferenceUserSerializer(serializers.ModelSerializer):
+    avatar = serializers.SerializerMethodField()
+    is_subscribed = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        fields = [
+            'email', 'id', 'username', 'first_name', 'last_name',
+            'is_subscribed', 'avatar'
+        ]
+
+    def get_avatar(self, obj):
+        request = self.context.get('request')
+        if obj.avatar:
+            return request.build_absolute_uri(obj.avatar.url)
+        return None
+
+    def get_is_subscribed(self, obj):
+        user = self.context['request'].user
+        return user.is_authenticated and obj.subscribers.filter(
+            user=user
+        ).exists()
+
+
+class ReferenceTagSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Tag
+        fields = ['id', 'name', 'slug']
+
+
+class ReferenceRecipeIngredientSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        model = RecipeIngredient
+        fields = ('id', 'name', 'measurement_unit', 'amount')
+
+
+class ReferenceRecipeSerializer(serializers.ModelSerializer):
+    author = ReferenceUserSerializer()
+    tags = ReferenceTagSerializer(many=True)
+    ingredients = ReferenceRecipeIngredientSerializer(
+        many=True, source='recipe_ingredients'
+    )
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Recipe
+        # Прежний to_representation добавлял ингредиенты последними.
+        fields = [
+            'id', 'tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+            'name', 'image', 'text', 'cooking_time', 'ingredients'
+        ]
+
+    def get_is_favorited(self, obj):
+        user = self.context['request'].user
+        return (
+            user.is_authenticated
+            and obj.favorited_by.filter(user=user).exists()
+        )
+
+    def get_is_in_shopping_cart(self, obj):
+        user = self.context['request'].user
+        return (
+            user.is_authenticated
+            and obj.in_shopping_cart.filter(user=user).exists()
+        )
+
+
+class ReferenceShortRecipeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Recipe
+        fields = ('id', 'name', 'image', 'cooking_time')
+
+
+class ReferenceSubscriptionSerializer(ReferenceUserSerializer):
+    recipes = ReferenceShortRecipeSerializer(many=True)
+    recipes_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        fields = (
+            'id', 'email', 'username', 'first_name', 'last_name',
+            'is_subscribed', 'recipes', 'recipes_count', 'avatar'
+        )
+
+    def get_recipes_count(self, obj):
+        return obj.recipes.count()
+
+
+def reference_data(serializer_class, instance, user):
+    request = APIRequestFactory().get('/')
+    force_authenticate(request, user)
+    return serializer_class(
+        instance, context={'request': Request(request)}
+    ).data
+
+
+@pytest.fixture
+def author_with_avatar(author):
+    author.avatar = ContentFile(make_png(), name='avatar.png')
+    author.save()
+    return author
+
+
+@pytest.fixture
+def flagged_recipe(author_with_avatar, reader, make_recipe):
+    recipe = make_recipe(author_with_avatar, amounts=(10, 20, 30))
+    FavoriteRecipe.objects.create(user=reader, recipe=recipe)
+    ShoppingCart.objects.create(user=reader, recipe=recipe)
+    Subscription.objects.create(user=reader, author=author_with_avatar)
+    return recipe
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('client_name, user_name', (
+    ('reader_client', 'reader'),
+    ('anon_client', None),
+))
+def test_recipe_representation_matches_drf(
+    request, flagged_recipe, client_name, user_name
+):
+    client = request.getfixturevalue(client_name)
+    user = request.getfixturevalue(user_name) if user_name else None
+    expected = reference_data(ReferenceRecipeSerializer, flagged_recipe, user)
+    assert client.get(f'/api/recipes/{flagged_recipe.id}/').data == expected
+    assert client.get('/api/recipes/').data['results'] == [expected]
+    # Второй запрос собирается из кеша общей части представления.
+    assert client.get(f'/api/recipes/{flagged_recipe.id}/').data == expected
+
+
+@pytest.mark.django_db
+def test_user_representation_matches_drf(
+    reader, reader_client, flagged_recipe, author_with_avatar
+):
+    expected = reference_data(
+        ReferenceUserSerializer, author_with_avatar, reader
+    )
+    response = reader_client.get(f'/api/users/{author_with_avatar.id}/')
+    assert response.data == expected
+    assert list(response.data) == list(expected)
+    assert expected['is_subscribed'] is True
+    assert expected['avatar'].startswith('http://testserver/media/')
+
+
+@pytest.mark.django_db
+def test_subscription_representation_matches_drf(
+    reader, reader_client, flagged_recipe, author_with_avatar
+):
+    author_with_avatar.refresh_from_db()
+    expected = reference_data(
+        ReferenceSubscriptionSerializer, author_with_avatar, reader
+    )
+    response = reader_client.get('/api/users/subscriptions/')
+    assert response.data['results'] == [expected]
+    assert list(response.data['results'][0]) == list(expected)
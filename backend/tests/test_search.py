@@ -0,0 +1,76 @@
+import pytest
+
+from recipes import search
+
+LIST_URL = '/api/recipes/'
+
+
+@pytest.fixture(params=('postgresql', 'fallback'))
+def search_backend(request, monkeypatch):
+    """Поиск через tsvector PostgreSQL и через переносимый индекс."""
+    if request.param == 'fallback':
+        monkeypatch.setattr(search, 'is_postgresql', lambda using: False)
+    return request.param
+
+
+@pytest.fixture
+def soups(search_backend, author, make_recipe):
+    return {
+        'name': make_recipe(
+            author, name='Борщ украинский', text='Свёкла, капуста.'
+        ),
+        'text': make_recipe(
+            author, name='Обед', text='Подаётся перед борщом.'
+        ),
+        'other': make_recipe(
+            author, name='Блины', text='Мука, молоко, яйца.'
+        ),
+    }
+
+
+def found_ids(client, query):
+    response = client.get(LIST_URL, {'search': query})
+    assert response.status_code == 200
+    return [recipe['id'] for recipe in response.data['results']]
+
+
+@pytest.mark.django_db
+def test_search_ranks_name_matches_first(anon_client, soups):
+    assert found_ids(anon_client, 'борщ') == [
+        soups['name'].id, soups['text'].id
+    ]
+
+
+@pytest.mark.django_db
+def test_search_requires_all_words(anon_client, soups):
+    assert found_ids(anon_client, 'борщ свёкла') == [soups['name'].id]
+
+
+@pytest.mark.django_db
+def test_search_follows_recipe_edits(anon_client, soups):
+    recipe = soups['other']
+    recipe.name = 'Блины с борщом'
+    recipe.save()
+    assert recipe.id in found_ids(anon_client, 'борщ')
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query', ('!!', '...', '—'))
+def test_punctuation_only_query_finds_nothing(anon_client, soups, query):
+    assert found_ids(anon_client, query) == []
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query', ('и', 'и в на'))
+def test_stop_word_only_query_does_not_fail(anon_client, soups, query):
+    assert found_ids(anon_client, query) == []
+
+
+@pytest.mark.django_db
+def test_explicit_ordering_overrides_rank(anon_client, soups):
+    response = anon_client.get(
+        LIST_URL, {'search': 'борщ', 'ordering': 'id'}
+    )
+    assert [recipe['id'] for recipe in response.data['results']] == sorted(
+        [soups['name'].id, soups['text'].id]
+    )
@@ -0,0 +1,121 @@
+import csv
+import io
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from recipes import shopping_list
+from recipes.models import ShoppingCart
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/'
+
+
+class BrokenExecutor:
+    """Пул, воркеры которого погибли: задачи завершаются ошибкой."""
+
+    def __init__(self, fail_on_submit=False):
+        self.fail_on_submit = fail_on_submit
+
+    def submit(self, *args, **kwargs):
+        if self.fail_on_submit:
+            raise BrokenProcessPool('pool is broken')
+        future = Future()
+        future.set_exception(BrokenProcessPool('worker died'))
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+@pytest.fixture
+def cart(reader, author, make_recipe):
+    recipes = [
+        make_recipe(author, name='Первый', amounts=(10, 20)),
+        make_recipe(author, name='Второй', amounts=(5,)),
+    ]
+    for recipe in recipes:
+        ShoppingCart.objects.create(user=reader, recipe=recipe)
+    return recipes
+
+
+def download(client, file_format, attempts=50):
+    """Повторяет запрос, пока файл рендерится, как это делает клиент."""
+    for _ in range(attempts):
+        response = client.get(DOWNLOAD_URL, {'format': file_format})
+        if response.status_code != 202:
+            return response
+        time.sleep(float(response['Retry-After']) / 10)
+    raise AssertionError('Файл так и не был готов.')
+
+
+@pytest.mark.django_db
+def test_csv_export(reader_client, cart, ingredients):
+    response = download(reader_client, 'csv')
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'text/csv'
+    assert 'shopping_list.csv' in response['Content-Disposition']
+    rows = list(csv.reader(io.StringIO(response.content.decode('utf-8-sig'))))
+    assert rows == [
+        ['Ингредиент', 'Единица измерения', 'Количество'],
+        [ingredients[0].name, 'г', '15'],
+        [ingredients[1].name, 'г', '20'],
+    ]
+
+
+@pytest.mark.django_db
+def test_pdf_export(reader_client, cart):
+    response = download(reader_client, 'pdf')
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/pdf'
+    assert response.content.startswith(b'%PDF')
+
+
+@pytest.mark.django_db
+def test_export_in_progress_answers_202_in_json(
+    monkeypatch, reader_client, cart
+):
+    monkeypatch.setattr(shopping_list, 'SHOPPING_LIST_WAIT_TIMEOUT', 0)
+    monkeypatch.setattr(
+        shopping_list, 'submit_render', lambda *args: Future()
+    )
+    response = reader_client.get(DOWNLOAD_URL, {'format': 'pdf'})
+    assert response.status_code == 202
+    assert response['Content-Type'] == 'application/json'
+    assert int(response['Retry-After']) > 0
+    assert response.json() == {'detail': 'Список покупок готовится.'}
+    shopping_list._pending.clear()
+
+
+@pytest.mark.django_db
+def test_pool_broken_before_submit_is_recreated(
+    monkeypatch, reader_client, cart
+):
+    monkeypatch.setattr(
+        shopping_list, '_executor', BrokenExecutor(fail_on_submit=True)
+    )
+    response = download(reader_client, 'csv')
+    assert response.status_code == 200
+    assert not isinstance(shopping_list._executor, BrokenExecutor)
+
+
+@pytest.mark.django_db
+def test_pool_broken_during_render_is_recreated(
+    monkeypatch, reader_client, cart
+):
+    monkeypatch.setattr(shopping_list, '_executor', BrokenExecutor())
+    response = reader_client.get(DOWNLOAD_URL, {'format': 'csv'})
+    assert response.status_code == 202
+    assert shopping_list._executor is None
+    assert download(reader_client, 'csv').status_code == 200
+
+
+@pytest.mark.django_db
+def test_txt_download_is_streamed(reader_client, cart, ingredients):
+    response = reader_client.get(DOWNLOAD_URL)
+    assert response.status_code == 200
+    assert response.streaming
+    assert b''.join(response.streaming_content).decode() == (
+        f'{ingredients[0].name} (г) — 15\n{ingredients[1].name} (г) — 20'
+    )
@@ -0,0 +1,204 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes import admin as recipes_admin
+from recipes.models import Recipe, ShoppingCart, ShoppingListItem
+from recipes.shopping_list_items import live_shopping_lists
+
+
+def stored_list(user):
+    return dict(ShoppingListItem.objects.filter(user=user).values_list(
+        'ingredient_id', 'amount'
+    ))
+
+
+def live_list(user):
+    return {
+        ingredient_id: amount
+        for (_, ingredient_id), amount
+        in live_shopping_lists([user.id]).items()
+    }
+
+
+@pytest.fixture
+def recipes(author, make_recipe):
+    return (
+        make_recipe(author, name='Первый', amounts=(10, 20)),
+        make_recipe(author, name='Второй', amounts=(5,)),
+    )
+
+
+@pytest.mark.django_db
+def test_cart_api_keeps_shopping_list_in_sync(
+    reader, reader_client, recipes, ingredients
+):
+    first, second = recipes
+    for recipe in recipes:
+        response = reader_client.post(
+            f'/api/recipes/{recipe.id}/shopping_cart/'
+        )
+        assert response.status_code == 201
+    assert stored_list(reader) == {
+        ingredients[0].id: 15, ingredients[1].id: 20
+    }
+    reader_client.delete(f'/api/recipes/{first.id}/shopping_cart/')
+    assert stored_list(reader) == {ingredients[0].id: 5}
+    reader_client.delete(f'/api/recipes/{second.id}/shopping_cart/')
+    assert stored_list(reader) == {}
+
+
+@pytest.mark.django_db
+def test_recipe_edit_refreshes_shopping_lists(
+    reader, author_client, recipes, ingredients
+):
+    first, _ = recipes
+    ShoppingCart.objects.create(user=reader, recipe=first)
+    response = author_client.patch(
+        f'/api/recipes/{first.id}/',
+        {'ingredients': [
+            {'id': ingredients[0].id, 'amount': 1},
+            {'id': ingredients[2].id, 'amount': 7},
+        ]},
+        format='json'
+    )
+    assert response.status_code == 200
+    assert stored_list(reader) == live_list(reader) == {
+        ingredients[0].id: 1, ingredients[2].id: 7
+    }
+
+
+@pytest.mark.django_db
+def test_recipe_edit_updates_lists_incrementally(
+    reader, make_user, author_client, recipes, ingredients
+):
+    first, second = recipes
+    other = make_user('other')
+    for user in (reader, other):
+        ShoppingCart.objects.create(user=user, recipe=first)
+    ShoppingCart.objects.create(user=reader, recipe=second)
+    with CaptureQueriesContext(connection) as queries:
+        author_client.patch(
+            f'/api/recipes/{first.id}/',
+            {'ingredients': [
+                {'id': ingredients[0].id, 'amount': 3},
+                {'id': ingredients[2].id, 'amount': 7},
+            ]},
+            format='json'
+        )
+    assert stored_list(reader) == live_list(reader) == {
+        ingredients[0].id: 8, ingredients[2].id: 7
+    }
+    assert stored_list(other) == live_list(other) == {
+        ingredients[0].id: 3, ingredients[2].id: 7
+    }
+    # Списки не пересчитываются из корзин: агрегат не выполняется.
+    assert not [
+        query['sql'] for query in queries.captured_queries
+        if ShoppingListItem._meta.db_table in query['sql']
+        and 'SUM(' in query['sql'].upper()
+    ]
+
+
+@pytest.fixture
+def admin_client(client, make_user):
+    admin_user = make_user('admin')
+    admin_user.is_staff = admin_user.is_superuser = True
+    admin_user.save()
+    client.force_login(admin_user)
+    return client
+
+
+def admin_form(recipe):
+    rows = list(recipe.recipe_ingredients.order_by('pk'))
+    data = {
+        'name': recipe.name,
+        'author': recipe.author_id,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'tags': [tag.pk for tag in recipe.tags.all()],
+        'recipe_ingredients-TOTAL_FORMS': len(rows),
+        'recipe_ingredients-INITIAL_FORMS': len(rows),
+        'recipe_ingredients-MIN_NUM_FORMS': 1,
+        'recipe_ingredients-MAX_NUM_FORMS': 1000,
+    }
+    for index, row in enumerate(rows):
+        data.update({
+            f'recipe_ingredients-{index}-id': row.pk,
+            f'recipe_ingredients-{index}-recipe': recipe.pk,
+            f'recipe_ingredients-{index}-ingredient': row.ingredient_id,
+            f'recipe_ingredients-{index}-amount': row.amount,
+        })
+    return data
+
+
+@pytest.mark.django_db
+def test_admin_save_without_related_changes(
+    admin_client, reader, recipes, monkeypatch
+):
+    first, _ = recipes
+    ShoppingCart.objects.create(user=reader, recipe=first)
+    calls = []
+    monkeypatch.setattr(
+        recipes_admin, 'change_shopping_lists_for_recipe',
+        lambda *args: calls.append(args)
+    )
+    monkeypatch.setattr(
+        type(Recipe.objects.none()), 'touch',
+        lambda queryset: calls.append('touch')
+    )
+    data = admin_form(first)
+    data['name'] = 'Новое название'
+    response = admin_client.post(
+        f'/admin/recipes/recipe/{first.pk}/change/', data
+    )
+    assert response.status_code == 302
+    assert calls == []
+
+
+@pytest.mark.django_db
+def test_admin_ingredient_change_updates_lists(
+    admin_client, reader, recipes, ingredients
+):
+    first, _ = recipes
+    ShoppingCart.objects.create(user=reader, recipe=first)
+    updated_at = Recipe.objects.get(pk=first.pk).updated_at
+    data = admin_form(first)
+    data['recipe_ingredients-1-amount'] = 50
+    response = admin_client.post(
+        f'/admin/recipes/recipe/{first.pk}/change/', data
+    )
+    assert response.status_code == 302
+    assert stored_list(reader) == {
+        ingredients[0].id: 10, ingredients[1].id: 50
+    }
+    assert Recipe.objects.get(pk=first.pk).updated_at > updated_at
+
+
+@pytest.mark.django_db
+def test_recipe_deletion_removes_its_ingredients(
+    reader, recipes, ingredients
+):
+    first, second = recipes
+    for recipe in recipes:
+        ShoppingCart.objects.create(user=reader, recipe=recipe)
+    first.delete()
+    assert stored_list(reader) == {ingredients[0].id: 5}
+
+
+@pytest.mark.django_db
+def test_check_shopping_lists_fixes_drift(reader, recipes):
+    for recipe in recipes:
+        ShoppingCart.objects.create(user=reader, recipe=recipe)
+    expected = stored_list(reader)
+    ShoppingListItem.objects.filter(user=reader).update(amount=999)
+    output = StringIO()
+    call_command('check_shopping_lists', stdout=output)
+    assert stored_list(reader) != expected
+    call_command('check_shopping_lists', '--fix', stdout=output)
+    assert stored_list(reader) == expected
+    call_command('check_shopping_lists', stdout=output)
+    assert 'совпадают' in output.getvalue().splitlines()[-1]
@@ -0,0 +1,148 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from recipes import redirects
+from recipes.constants import (MAX_RECIPE_ID, SHORT_LINK_LRU_TIMEOUT,
+                               SHORT_LINK_MIN_LENGTH,
+                               SHORT_LINK_REDIRECT_MAX_AGE)
+from recipes.models import Recipe
+from recipes.short_links import decode_short_link, encode_short_link
+
+FRONTEND_URL = 'https://frontend.example.com'
+
+
+@pytest.fixture(autouse=True)
+def frontend_url(settings):
+    settings.FRONTEND_URL = FRONTEND_URL
+
+
+@pytest.fixture(autouse=True)
+def clean_lru():
+    redirects._lru.clear()
+    yield
+    redirects._lru.clear()
+
+
+@pytest.mark.parametrize('recipe_id', (1, 2, 61, 62, 10 ** 6, 10 ** 12))
+def test_short_link_round_trip(recipe_id):
+    code = encode_short_link(recipe_id)
+    assert len(code) >= SHORT_LINK_MIN_LENGTH
+    assert decode_short_link(code) == recipe_id
+
+
+def test_short_links_are_unique():
+    codes = {encode_short_link(recipe_id) for recipe_id in range(1, 5000)}
+    assert len(codes) == 4999
+
+
+@pytest.mark.parametrize('code', ('abcd', 'ab-cd!', ''))
+def test_legacy_and_foreign_codes_are_not_decoded(code):
+    assert decode_short_link(code) is None
+
+
+def test_largest_recipe_id_round_trip():
+    assert decode_short_link(encode_short_link(MAX_RECIPE_ID)) == (
+        MAX_RECIPE_ID
+    )
+
+
+@pytest.mark.parametrize('code', (
+    'z' * 30,
+    encode_short_link(MAX_RECIPE_ID + 1),
+    '00000',
+))
+def test_codes_out_of_id_range_are_not_decoded(code):
+    assert decode_short_link(code) is None
+
+
+@pytest.mark.django_db
+def test_get_link_resolves_to_recipe(anon_client, recipe):
+    response = anon_client.get(f'/api/recipes/{recipe.id}/get-link/')
+    assert response.status_code == 200
+    short_link = response.data['short-link']
+    assert short_link == (
+        f'http://testserver/s/{encode_short_link(recipe.id)}'
+    )
+    # Ссылка без завершающего слеша: сначала срабатывает APPEND_SLASH.
+    response = anon_client.get(short_link.replace('http://testserver', ''))
+    response = anon_client.get(response['Location'])
+    assert response['Location'] == f'{FRONTEND_URL}/recipes/{recipe.id}/'
+
+
+@pytest.mark.django_db
+def test_legacy_short_link_still_resolves(anon_client, recipe):
+    Recipe.objects.filter(pk=recipe.pk).update(short_link='aB3x')
+    recipe.refresh_from_db()
+    assert recipe.get_short_link() == 'aB3x'
+    response = anon_client.get('/s/aB3x/')
+    assert response['Location'] == f'{FRONTEND_URL}/recipes/{recipe.id}/'
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'code', ('zzzz', '00000', 'ZZZZZZZZ', 'z' * 30)
+)
+def test_unknown_short_link_is_404(anon_client, recipe, code):
+    assert anon_client.get(f'/s/{code}/').status_code == 404
+
+
+@pytest.mark.django_db
+def test_backfill_short_links(recipe, author, make_recipe):
+    legacy = make_recipe(author, name='Старый')
+    Recipe.objects.filter(pk=legacy.pk).update(short_link='old1')
+    call_command('backfill_short_links', stdout=StringIO())
+    assert dict(Recipe.objects.values_list('pk', 'short_link')) == {
+        recipe.pk: encode_short_link(recipe.pk),
+        legacy.pk: 'old1',
+    }
+
+
+@pytest.mark.django_db
+def test_redirect_is_temporary_and_briefly_cached(anon_client, recipe):
+    response = anon_client.get(f'/s/{encode_short_link(recipe.id)}/')
+    assert response.status_code == 302
+    assert f'max-age={SHORT_LINK_REDIRECT_MAX_AGE}' in (
+        response['Cache-Control']
+    )
+    assert SHORT_LINK_REDIRECT_MAX_AGE <= 300
+
+
+@pytest.mark.django_db
+def test_redirect_stops_after_recipe_deleted(anon_client, recipe):
+    url = f'/s/{encode_short_link(recipe.id)}/'
+    assert anon_client.get(url).status_code == 302
+    recipe.delete()
+    assert anon_client.get(url).status_code == 404
+
+
+@pytest.mark.django_db
+def test_stale_lru_entry_of_other_worker_expires(
+    anon_client, recipe, monkeypatch
+):
+    url = f'/s/{encode_short_link(recipe.id)}/'
+    assert anon_client.get(url).status_code == 302
+    # Рецепт удалён в другом воркере: общий кеш очищен, а LRU этого
+    # процесса об удалении не знает.
+    lru = dict(redirects._lru)
+    recipe.delete()
+    redirects._lru.update(lru)
+    assert anon_client.get(url).status_code == 302
+    now = redirects.time.monotonic()
+    monkeypatch.setattr(
+        redirects.time, 'monotonic',
+        lambda: now + SHORT_LINK_LRU_TIMEOUT + 1
+    )
+    assert anon_client.get(url).status_code == 404
+
+
+@pytest.mark.django_db
+def test_export_short_link_map(recipe):
+    output = StringIO()
+    call_command('export_short_link_map', stdout=output)
+    code = encode_short_link(recipe.id)
+    assert (
+        f'/s/{code}/ {FRONTEND_URL}/recipes/{recipe.id}/;'
+        in output.getvalue()
+    )
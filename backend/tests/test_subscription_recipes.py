@@ -0,0 +1,106 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Recipe
+from users.models import Subscription
+
+RECIPES_PER_AUTHOR = (4, 1, 3)
+# Страница авторов, COUNT, рецепты всех авторов страницы и подписки.
+SUBSCRIPTION_QUERIES = 4
+
+
+@pytest.fixture
+def authors(make_user, make_recipe, reader):
+    authors = []
+    for number, count in enumerate(RECIPES_PER_AUTHOR):
+        author = make_user(f'author{number}')
+        for index in range(count):
+            make_recipe(author, name=f'Рецепт {number}-{index}')
+        Subscription.objects.create(user=reader, author=author)
+        authors.append(author)
+    return authors
+
+
+def newest(author, limit=None):
+    ids = list(Recipe.objects.filter(author=author).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', flat=True))
+    return ids if limit is None else ids[:limit]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('limit', (None, 0, 1, 2, 10))
+def test_latest_by_author(authors, limit):
+    latest = Recipe.objects.latest_by_author(
+        [author.id for author in authors], limit
+    )
+    assert {
+        author_id: [recipe.id for recipe in recipes]
+        for author_id, recipes in latest.items()
+    } == {author.id: newest(author, limit) for author in authors}
+
+
+@pytest.mark.django_db
+def test_latest_by_author_without_authors():
+    assert Recipe.objects.latest_by_author([], 2) == {}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('limit', (1, 2, 3))
+def test_subscriptions_limit_recipes_per_author(
+    reader_client, authors, limit
+):
+    response = reader_client.get(
+        '/api/users/subscriptions/', {'recipes_limit': limit}
+    )
+    assert response.status_code == 200
+    by_author = {
+        author['id']: author for author in response.data['results']
+    }
+    for author, count in zip(authors, RECIPES_PER_AUTHOR):
+        data = by_author[author.id]
+        assert [recipe['id'] for recipe in data['recipes']] == (
+            newest(author, limit)
+        )
+        assert data['recipes_count'] == count
+        assert set(data['recipes'][0]) == {
+            'id', 'name', 'image', 'cooking_time'
+        }
+
+
+def subscription_queries(client):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(
+            '/api/users/subscriptions/', {'recipes_limit': 2, 'limit': 50}
+        )
+    assert response.status_code == 200
+    return len(queries)
+
+
+@pytest.mark.django_db
+def test_subscription_queries_do_not_depend_on_authors(
+    reader, reader_client, authors, make_user, make_recipe
+):
+    assert subscription_queries(reader_client) == SUBSCRIPTION_QUERIES
+    for number in range(5):
+        author = make_user(f'more{number}')
+        make_recipe(author, name=f'Ещё {number}')
+        make_recipe(author, name=f'И ещё {number}')
+        Subscription.objects.create(user=reader, author=author)
+    assert subscription_queries(reader_client) == SUBSCRIPTION_QUERIES
+
+
+@pytest.mark.django_db
+def test_subscribe_returns_limited_recipes(reader_client, make_user,
+                                           make_recipe):
+    author = make_user('new_author')
+    for index in range(3):
+        make_recipe(author, name=f'Новый {index}')
+    response = reader_client.post(
+        f'/api/users/{author.id}/subscribe/?recipes_limit=2'
+    )
+    assert response.status_code == 201
+    assert [recipe['id'] for recipe in response.data['recipes']] == (
+        newest(author, 2)
+    )
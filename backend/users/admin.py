@@ -32,13 +32,16 @@ class UserAdmin(BaseUserAdmin):
             )
         return "-"
 
-    @admin.display(description='Кол-во подписчиков')
+    @admin.display(
+        description='Кол-во подписчиков',
+        ordering='subscribers_count'
+    )
     def subscription_count(self, obj):
-        return obj.subscribers.count()
+        return obj.subscribers_count
 
-    @admin.display(description='Кол-во рецептов')
+    @admin.display(description='Кол-во рецептов', ordering='recipes_count')
     def recipe_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
 
 @admin.register(Subscription)
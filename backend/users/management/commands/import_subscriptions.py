@@ -0,0 +1,126 @@
+import csv
+import json
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.cache import bump_version, user_version_key
+from recipes.db import insert_ignore
+from users.models import Subscription, refresh_subscribers_count
+
+User = get_user_model()
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def read_csv(file):
+    for row in csv.DictReader(file):
+        yield row['user'], row['author']
+
+
+def read_jsonl(file):
+    for line in file:
+        if line.strip():
+            row = json.loads(line)
+            yield row['user'], row['author']
+
+
+READERS = {'csv': read_csv, 'jsonl': read_jsonl}
+
+
+def resolve_users(values):
+    """
+    Сопоставляет значениям из файла id пользователей: значение с «@»
+    считается email, остальные — id.
+    """
+    values = {str(value).strip() for value in values}
+    emails = {value for value in values if '@' in value}
+    ids = {int(value) for value in values - emails if value.isdigit()}
+    resolved = dict(User.objects.filter(email__in=emails).values_list(
+        'email', 'pk'
+    ))
+    resolved.update(
+        (str(pk), pk) for pk in User.objects.filter(
+            pk__in=ids
+        ).values_list('pk', flat=True)
+    )
+    return resolved
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует подписки из CSV (колонки user, author) или JSONL '
+        '({"user": ..., "author": ...}). Пользователь задаётся id или '
+        'email. Подписки на себя, неизвестные пользователи и дубликаты '
+        'пропускаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу с подписками.')
+        parser.add_argument(
+            '--format',
+            choices=READERS,
+            help='Формат файла; по умолчанию определяется по расширению.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Сколько пар записывать одним INSERT.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if file_format not in READERS:
+            raise CommandError(
+                'Не удалось определить формат файла, укажите --format.'
+            )
+        totals = {'read': 0, 'created': 0, 'skipped': 0}
+        started = time.monotonic()
+        with open(path, encoding='utf-8') as file:
+            pairs = READERS[file_format](file)
+            while True:
+                batch = list(islice(pairs, options['batch_size']))
+                if not batch:
+                    break
+                created = self.import_batch(batch)
+                totals['read'] += len(batch)
+                totals['created'] += created
+                totals['skipped'] += len(batch) - created
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'Прочитано {totals["read"]}, создано '
+                    f'{totals["created"]}, пропущено {totals["skipped"]}; '
+                    f'{totals["read"] / elapsed:.0f} пар/с.'
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт завершён за {time.monotonic() - started:.1f} с: '
+            f'создано {totals["created"]} подписок, '
+            f'пропущено {totals["skipped"]}.'
+        ))
+
+    def import_batch(self, batch):
+        """Записывает пачку пар и возвращает число созданных подписок."""
+        resolved = resolve_users(value for pair in batch for value in pair)
+        pairs = {
+            (resolved[str(user).strip()], resolved[str(author).strip()])
+            for user, author in batch
+            if str(user).strip() in resolved
+            and str(author).strip() in resolved
+        }
+        pairs = {(user, author) for user, author in pairs if user != author}
+        if not pairs:
+            return 0
+        with transaction.atomic():
+            created = insert_ignore(
+                Subscription(user_id=user, author_id=author)
+                for user, author in pairs
+            )
+            refresh_subscribers_count({author for _, author in pairs})
+        for user_id in {user for user, _ in pairs}:
+            bump_version(user_version_key(user_id))
+        return created
@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from users.models import Subscription, count_by_author
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики рецептов и подписчиков пользователей.'
+
+    def handle(self, *args, **options):
+        updated = User.objects.update(
+            recipes_count=count_by_author(Recipe.objects.all()),
+            subscribers_count=count_by_author(Subscription.objects.all())
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики пересчитаны для {updated} пользователей.'
+        ))
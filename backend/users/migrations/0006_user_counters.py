@@ -0,0 +1,43 @@
+# Generated by Django 3.2.3 on 2026-10-17 09:30
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Subscription = apps.get_model('users', 'Subscription')
+    recipes = Recipe.objects.filter(author=OuterRef('pk')).order_by().values(
+        'author'
+    ).annotate(total=Count('pk')).values('total')
+    subscribers = Subscription.objects.filter(
+        author=OuterRef('pk')
+    ).order_by().values('author').annotate(total=Count('pk')).values('total')
+    User.objects.update(
+        recipes_count=Coalesce(Subquery(recipes), 0),
+        subscribers_count=Coalesce(Subquery(subscribers), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_auto_20250114_1716'),
+        ('recipes', '0006_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Кол-во рецептов'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='subscribers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Кол-во подписчиков'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,10 @@
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
+from recipes.db import DerivedFieldsMixin
 from users.constants import (AVATAR_UPLOAD_PATH, EMAIL_MAX_LENGTH,
                              NAME_MAX_LENGTH)
 
@@ -13,7 +16,7 @@ def validate_self_subscription(user, author):
         raise ValidationError('Вы уже подписаны на этого пользователя.')
 
 
-class User(AbstractUser):
+class User(DerivedFieldsMixin, AbstractUser):
     email = models.EmailField(
         unique=True,
         max_length=EMAIL_MAX_LENGTH,
@@ -35,9 +38,21 @@ class User(AbstractUser):
         max_length=NAME_MAX_LENGTH,
         verbose_name='Фамилия'
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Кол-во рецептов'
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Кол-во подписчиков'
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
+    # Счётчики меняются только атомарными UPDATE.
+    DERIVED_FIELDS = ('recipes_count', 'subscribers_count')
 
     class Meta:
         ordering = ['email']
@@ -46,6 +61,30 @@ class User(AbstractUser):
         return self.email
 
 
+def adjust_counter(user_id, field, delta):
+    """Атомарно изменяет счётчик пользователя, не опуская его ниже нуля."""
+    users = User.objects.filter(pk=user_id)
+    if delta < 0:
+        users = users.filter(**{f'{field}__gte': -delta})
+    users.update(**{field: F(field) + delta})
+
+
+def count_by_author(queryset):
+    """Выражение для UPDATE: число строк queryset с author = пользователю."""
+    return Coalesce(Subquery(
+        queryset.filter(author=OuterRef('pk')).order_by().values(
+            'author'
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def refresh_subscribers_count(author_ids):
+    """Пересчитывает subscribers_count авторов одним UPDATE."""
+    User.objects.filter(pk__in=author_ids).update(
+        subscribers_count=count_by_author(Subscription.objects.all())
+    )
+
+
 class Subscription(models.Model):
     user = models.ForeignKey(
         User,
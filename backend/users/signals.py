@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import Subscription, adjust_counter
+
+
+@receiver(post_save, sender=Subscription)
+def increment_subscribers_count(sender, instance, created, **kwargs):
+    if created:
+        adjust_counter(instance.author_id, 'subscribers_count', 1)
+
+
+@receiver(post_delete, sender=Subscription)
+def decrement_subscribers_count(sender, instance, **kwargs):
+    adjust_counter(instance.author_id, 'subscribers_count', -1)